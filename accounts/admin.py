@@ -5,6 +5,8 @@ admin.site.register(User)
 admin.site.register(Booking)
 admin.site.register(Services)
 admin.site.register(Contact)
+admin.site.register(OutboxEmail)
+admin.site.register(ArchivedContactBatch)
 
 
 
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        from .rendering import renderer
+
+        # Compile the email templates once at startup instead of on first send
+        renderer.load()
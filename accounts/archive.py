@@ -0,0 +1,146 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedContactBatch, Contact
+from .routers import PRIMARY
+
+
+COLUMNS = ('id', 'name', 'email', 'phone', 'message', 'created_at', 'is_responded', 'assigned_to_id')
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+def archive_dir():
+    return str(getattr(settings, 'ARCHIVE_DIR', 'archive'))
+
+
+def retention_cutoff(days=None):
+    days = getattr(settings, 'CONTACT_RETENTION_DAYS', 365) if days is None else days
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def _encode(value):
+    # isoformat() keeps microseconds, which DjangoJSONEncoder would drop
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_batch_file(partition, rows):
+    """
+    Write rows to <ARCHIVE_DIR>/contacts/<partition>/<min id>-<max id>.ndjson.gz
+    through a temporary file, and return (relative path, sha256). The name
+    only depends on the rows, so a rerun after a crash overwrites the file.
+    """
+    relative = os.path.join('contacts', partition, f"{rows[0]['id']:012d}-{rows[-1]['id']:012d}.ndjson.gz")
+    path = os.path.join(archive_dir(), relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + '.part'
+    with open(partial, 'wb') as raw:
+        # mtime=0 keeps the output, and so the checksum, reproducible
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+            for row in rows:
+                f.write(json.dumps(row, default=_encode).encode() + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+    return relative, file_checksum(path)
+
+
+def read_batch_file(batch):
+    """Yield the archived rows of one batch after checking its checksum"""
+    path = os.path.join(archive_dir(), batch.path)
+    if file_checksum(path) != batch.sha256:
+        raise ChecksumMismatch(f"{batch.path} does not match its recorded checksum")
+    with gzip.open(path, 'rb') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def archive_batch(cutoff, batch_size=1000):
+    """
+    Move up to `batch_size` of the oldest contacts created before `cutoff`
+    into archive files, one per month. Each file is written and re-read
+    before its rows are deleted, and the delete commits together with the
+    batch record, so stopping at any point loses nothing and a rerun picks
+    up where it stopped. Returns the number of contacts archived.
+    """
+    rows = list(
+        Contact.objects.using(PRIMARY).filter(created_at__lt=cutoff).order_by('id').values(*COLUMNS)[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    written = []
+    for partition, group in groupby(rows, key=lambda row: row['created_at'].strftime('%Y-%m')):
+        group = list(group)
+        relative, checksum = write_batch_file(partition, group)
+        batch = ArchivedContactBatch(partition=partition, path=relative, min_id=group[0]['id'],
+                                     max_id=group[-1]['id'], count=len(group), sha256=checksum)
+        archived_ids = [row['id'] for row in read_batch_file(batch)]
+        if archived_ids != [row['id'] for row in group]:
+            raise ChecksumMismatch(f"{relative} does not contain the rows that were written")
+        written.append(batch)
+
+    with transaction.atomic(using=PRIMARY):
+        ArchivedContactBatch.objects.using(PRIMARY).bulk_create(written)
+        Contact.objects.using(PRIMARY).filter(id__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_contacts(cutoff, batch_size=1000, max_batches=None, progress=None):
+    """Archive every contact older than `cutoff`, one short transaction per batch"""
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        archived = archive_batch(cutoff, batch_size)
+        if not archived:
+            break
+        total += archived
+        batches += 1
+        if progress:
+            progress(total)
+    return total
+
+
+def verify_archive():
+    """(batch, error) for every archive file that is missing or fails its checksum"""
+    problems = []
+    for batch in ArchivedContactBatch.objects.order_by('min_id').iterator():
+        path = os.path.join(archive_dir(), batch.path)
+        if not os.path.exists(path):
+            problems.append((batch, 'missing'))
+        elif file_checksum(path) != batch.sha256:
+            problems.append((batch, 'checksum mismatch'))
+    return problems
+
+
+def find_archived_contact(contact_id):
+    """
+    The archived row for a contact id, or None. Only the batch files whose
+    id range covers the id are read, and each is at most one batch long.
+    """
+    candidates = ArchivedContactBatch.objects.filter(min_id__lte=contact_id, max_id__gte=contact_id)
+    for batch in candidates:
+        for row in read_batch_file(batch):
+            if row['id'] == contact_id:
+                row['partition'] = batch.partition
+                return row
+    return None
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from . import metrics
+from .auth import issue_access_token, issue_refresh_token, set_auth_cookies
+from .models import User
+from .serializers import ContactSerializer, UserSerializer
+from .throttling import check_rate
+from .views import ContactView
+
+
+logger = logging.getLogger(__name__)
+
+
+# PBKDF2 is deliberately slow; cap how many hashes run at once so a login
+# burst can't take every thread the server has
+password_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PASSWORD_HASHER_WORKERS', 4),
+    thread_name_prefix='password-hasher',
+)
+
+
+async def run_hasher(func, *args):
+    loop = asyncio.get_running_loop()
+    with metrics.timed('hash'):
+        return await loop.run_in_executor(password_executor, func, *args)
+
+
+def parse_body(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST.dict()
+
+
+def throttled(scope, request, data):
+    """The 429 response for a request over its rate limit, or None"""
+    wait = check_rate(scope, request, data.get('email'))
+    if wait is None:
+        return None
+    response = JsonResponse({'detail': f'Request was throttled. Expected available in {int(wait) + 1} seconds.'},
+                            status=429)
+    response['Retry-After'] = str(int(wait) + 1)
+    return response
+
+
+def verify_password(user, password):
+    # Unlike User.check_password this never re-hashes and saves the user, so
+    # the executor threads don't touch the database
+    return check_password(password, user.password)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncRegisterView(View):
+    """
+    Async RegisterView for ASGI deployments. The password is hashed in the
+    bounded hasher pool instead of on the event loop.
+    """
+    async def post(self, request):
+        data = parse_body(request)
+        if data is None:
+            return JsonResponse({'error': 'Invalid request body'}, status=400)
+        response = throttled('register', request, data)
+        if response is not None:
+            return response
+
+        serializer = UserSerializer(data=data)
+        # Field validation includes the unique email lookup
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=400)
+
+        validated = dict(serializer.validated_data)
+        password = validated.pop('password', None)
+        user = User(**validated)
+        user.password = await run_hasher(make_password, password)
+        try:
+            await user.asave()
+        except IntegrityError:
+            return JsonResponse({'email': ['user with this email already exists.']}, status=400)
+        return JsonResponse(UserSerializer(user).data, status=201)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncLoginView(View):
+    """
+    Async LoginView for ASGI deployments. Uses the async ORM for the user
+    lookup and the bounded hasher pool for the password check.
+    """
+    async def post(self, request):
+        data = parse_body(request) or {}
+        response = throttled('login', request, data)
+        if response is not None:
+            return response
+        email = data.get('email')
+        password = data.get('password')
+
+        if not email or not password:
+            return JsonResponse({'error': 'Email and password required'}, status=400)
+
+        user = await User.objects.filter(email=email).afirst()
+
+        if user is None:
+            return JsonResponse({'error': 'User not found'}, status=404)
+
+        if not await run_hasher(verify_password, user, password):
+            return JsonResponse({'error': 'Incorrect password'}, status=401)
+
+        refresh_token = await sync_to_async(issue_refresh_token)(user)
+        response = JsonResponse({
+            'message': 'Login successful',
+            'user': UserSerializer(user).data
+        })
+        set_auth_cookies(response, issue_access_token(user), refresh_token)
+        get_token(request)  # same as ensure_csrf_cookie on the sync view
+        return response
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncContactView(View):
+    """
+    Async contact form submission for ASGI deployments. Emails are only
+    queued in the outbox, never sent while the request waits.
+    """
+    async def post(self, request):
+        data = parse_body(request)
+        if data is None:
+            return JsonResponse({
+                'success': False,
+                'message': 'Please check your input and try again.',
+            }, status=400)
+        response = throttled('contact', request, data)
+        if response is not None:
+            return response
+
+        serializer = ContactSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse({
+                'success': False,
+                'message': 'Please check your input and try again.',
+                'errors': serializer.errors
+            }, status=400)
+
+        try:
+            # One short transaction: the row plus its two outbox emails
+            saved = await sync_to_async(ContactView().save_submission)(serializer)
+        except Exception as e:
+            logger.error(f"Contact submission error: {str(e)}")
+            return JsonResponse({
+                'success': False,
+                'message': 'An error occurred while processing your request. Please try again.'
+            }, status=500)
+
+        return JsonResponse({
+            'success': True,
+            'message': 'Thank you for your message. We will contact you within 24 hours.',
+            'data': saved
+        }, status=201)
@@ -1,31 +1,258 @@
+import copy
+import datetime
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
 import jwt
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from accounts.models import User  # adjust path to your User model
+from accounts.models import RefreshToken, User  # adjust path to your User model
+
+
+def issue_access_token(user):
+    """Short-lived token checked on every request"""
+    now = timezone.now()
+    payload = {
+        "id": user.id,
+        "type": "access",
+        "exp": now + datetime.timedelta(minutes=getattr(settings, 'JWT_ACCESS_TOKEN_LIFETIME_MINUTES', 15)),
+        "iat": now,
+    }
+    return jwt.encode(payload, 'secret', algorithm='HS256')
+
+
+def issue_refresh_token(user):
+    """Long-lived token that can only be exchanged at /api/token/refresh/"""
+    now = timezone.now()
+    expires_at = now + datetime.timedelta(days=getattr(settings, 'JWT_REFRESH_TOKEN_LIFETIME_DAYS', 14))
+    record = RefreshToken.objects.create(user=user, jti=uuid.uuid4().hex, expires_at=expires_at)
+    payload = {
+        "id": user.id,
+        "type": "refresh",
+        "jti": record.jti,
+        "exp": expires_at,
+        "iat": now,
+    }
+    return jwt.encode(payload, 'secret', algorithm='HS256')
+
+
+def set_auth_cookies(response, access_token, refresh_token):
+    response.set_cookie(
+        key='jwt',
+        value=access_token,
+        httponly=True,
+        secure=settings.DEBUG,  # Use secure cookies in production
+        samesite='Lax'
+    )
+    response.set_cookie(
+        key='refresh',
+        value=refresh_token,
+        max_age=getattr(settings, 'JWT_REFRESH_TOKEN_LIFETIME_DAYS', 14) * 24 * 3600,
+        path='/api/',
+        httponly=True,
+        secure=settings.DEBUG,
+        samesite='Lax'
+    )
+
+
+def delete_auth_cookies(response):
+    response.delete_cookie('jwt')
+    response.delete_cookie('refresh', path='/api/')
+
+
+def decode_refresh_token(token):
+    try:
+        payload = jwt.decode(token, 'secret', algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        raise AuthenticationFailed('Refresh token expired')
+    except jwt.InvalidTokenError:
+        raise AuthenticationFailed('Invalid refresh token')
+    if payload.get('type') != 'refresh' or 'jti' not in payload:
+        raise AuthenticationFailed('Invalid refresh token')
+    return payload
+
+
+def rotate_refresh_token(token):
+    """
+    Revoke the presented refresh token and return (user, access, refresh).
+    Presenting a token that was already revoked means it was copied, so
+    every outstanding refresh token for that user is revoked too.
+    """
+    payload = decode_refresh_token(token)
+    now = timezone.now()
+    # Conditional delete so two concurrent refreshes can't both succeed. A
+    # deleted row looks the same as a revoked one, so reuse is still caught.
+    rotated, _ = RefreshToken.objects.filter(
+        jti=payload['jti'], revoked_at__isnull=True, expires_at__gt=now
+    ).delete()
+    if not rotated:
+        RefreshToken.objects.filter(user_id=payload['id'], revoked_at__isnull=True).update(revoked_at=now)
+        raise AuthenticationFailed('Refresh token revoked')
+
+    user = User.objects.filter(id=payload['id'], is_active=True).first()
+    if user is None:
+        raise AuthenticationFailed('User not found')
+    return user, issue_access_token(user), issue_refresh_token(user)
+
+
+def revoke_refresh_token(token):
+    try:
+        payload = decode_refresh_token(token)
+    except AuthenticationFailed:
+        return 0
+    deleted, _ = RefreshToken.objects.filter(jti=payload['jti'], revoked_at__isnull=True).delete()
+    return deleted
+
+
+def prune_refresh_tokens():
+    """
+    Delete the refresh token rows that can never be used again: expired
+    ones, and those revoked when a copied token was detected. Returns the
+    number deleted.
+    """
+    deleted, _ = RefreshToken.objects.filter(
+        Q(expires_at__lte=timezone.now()) | Q(revoked_at__isnull=False)
+    ).delete()
+    return deleted
+
+
+class PrincipalCache:
+    """
+    Bounded LRU cache of verified token digest -> User, one per process.
+    Entries expire after `ttl` seconds or at the token's `exp`, whichever is
+    first. The User post_save/post_delete signals call invalidate_user(),
+    which also writes a revocation marker to the shared Django cache; every
+    hit is checked against it, so a change made in another worker (admin,
+    shell) takes effect on the next request everywhere. Bulk
+    QuerySet.update() does not send signals, so call invalidate_user()
+    after one that touches users.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # digest -> (user, expires_at, marker)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _marker_key(user_id):
+        return f"auth:principal:{user_id}"
+
+    def marker(self, user_id):
+        """
+        The user's current revocation marker. Read it before loading the
+        user and pass it to set(), so a revocation that lands in between
+        still invalidates the new entry. A missing marker (never written,
+        or evicted from the shared cache) is seeded with a fresh random
+        value, so it can never match an entry cached before it went.
+        """
+        key = self._marker_key(user_id)
+        value = cache.get(key)
+        if value is None:
+            value = uuid.uuid4().hex
+            if not cache.add(key, value, timeout=None):
+                value = cache.get(key, value)
+        return value
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[digest]
+                entry = None
+        if entry is not None and entry[2] != self.marker(entry[0].pk):
+            with self._lock:
+                self._entries.pop(digest, None)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+            self.hits += 1
+        # Each request gets its own instance so one view can't mutate another's user
+        return copy.copy(entry[0])
+
+    def set(self, digest, user, exp, marker):
+        expires_at = min(exp, time.time() + self.ttl)
+        with self._lock:
+            self._entries[digest] = (user, expires_at, marker)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        cache.set(self._marker_key(user_id), uuid.uuid4().hex, timeout=None)
+        with self._lock:
+            stale = [key for key, (user, _, _) in self._entries.items() if user.pk == user_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+principal_cache = PrincipalCache(
+    maxsize=getattr(settings, 'JWT_PRINCIPAL_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'JWT_PRINCIPAL_CACHE_TTL', 300),
+)
 
 
 class JWTAuthentication(BaseAuthentication):
     def authenticate(self, request):
         # Try to get token from cookie first
         token = request.COOKIES.get('jwt')
-        
+
         if not token:
             # Fallback to Authorization header
             auth_header = request.headers.get('Authorization')
             if auth_header and auth_header.startswith('Bearer '):
                 token = auth_header.split(' ')[1]
-        
+
         if not token:
             return None
 
+        # A cached digest means this exact token was already verified and has not expired
+        digest = principal_cache.digest(token)
+        user = principal_cache.get(digest)
+        if user is not None:
+            return (user, token)
+
         try:
-            payload = jwt.decode(token, 'secret', algorithms=['HS256'])
+            payload = jwt.decode(token, 'secret', algorithms=['HS256'], options={'require': ['exp', 'id']})
+            if payload.get('type') == 'refresh':
+                raise jwt.InvalidTokenError()
+            marker = principal_cache.marker(payload['id'])
             user = User.objects.get(id=payload['id'])
-            return (user, token)
         except jwt.ExpiredSignatureError:
             raise AuthenticationFailed('Token expired')
         except jwt.InvalidTokenError:
             raise AuthenticationFailed('Invalid token')
         except User.DoesNotExist:
             raise AuthenticationFailed('User not found')
+
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive')
+
+        principal_cache.set(digest, user, payload['exp'], marker)
+        return (user, token)
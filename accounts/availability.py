@@ -0,0 +1,107 @@
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import HOURS, Booking
+from .routers import PRIMARY
+
+
+SLOTS = tuple(value for value, _ in HOURS)
+SLOT_BITS = {slot: 1 << i for i, slot in enumerate(SLOTS)}
+
+VERSION_KEY = 'availability:version'
+
+
+def slot_capacity():
+    """How many bookings one service can take in the same slot"""
+    return getattr(settings, 'BOOKING_SLOT_CAPACITY', 1)
+
+
+def full_slot_bitmaps(service_id, date_from, date_to):
+    """
+    One aggregated query: {date: bitmap} where bit i is set when SLOTS[i]
+    is at capacity. Days with no full slot are left out. Reads the primary,
+    since the result is cached and must include the latest bookings.
+    """
+    rows = (
+        Booking.objects.using(PRIMARY).filter(service_id=service_id, date__range=(date_from, date_to))
+        .values('date', 'time')
+        .annotate(booked=Count('id'))
+        .filter(booked__gte=slot_capacity())
+        .values_list('date', 'time')
+    )
+    bitmaps = defaultdict(int)
+    for day, time in rows:
+        bitmaps[day] |= SLOT_BITS.get(time, 0)
+    return dict(bitmaps)
+
+
+def _day_key(service_id, day, version):
+    return f"availability:{version}:{service_id}:{day.isoformat()}"
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def cached_bitmaps(service_id, date_from, date_to):
+    """
+    Full-slot bitmaps for a date range, cached per service and day (free
+    days are cached as 0). Days that aren't cached yet are loaded together
+    in a single query.
+    """
+    version = _version()
+    days = [date_from + datetime.timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    keys = {day: _day_key(service_id, day, version) for day in days}
+    cached = cache.get_many(keys.values())
+
+    missing = [day for day in days if keys[day] not in cached]
+    if missing:
+        loaded = full_slot_bitmaps(service_id, missing[0], missing[-1])
+        fresh = {keys[day]: loaded.get(day, 0) for day in missing}
+        cache.set_many(fresh, getattr(settings, 'AVAILABILITY_CACHE_TTL', 300))
+        cached.update(fresh)
+
+    return {day: cached[keys[day]] for day in days if cached[keys[day]]}
+
+
+def free_slots(service_id, date_from, date_to):
+    """[(date, [free slot, ...]), ...] for every day in the range"""
+    bitmaps = cached_bitmaps(service_id, date_from, date_to)
+    now = timezone.localtime()
+    days = []
+    day = date_from
+    while day <= date_to:
+        if day >= now.date():
+            full = bitmaps.get(day, 0)
+            slots = [
+                slot for slot in SLOTS
+                if not full & SLOT_BITS[slot] and (day > now.date() or slot > now.strftime('%H:%M'))
+            ]
+        else:
+            slots = []
+        days.append((day, slots))
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def refresh_day(service_id, day):
+    """
+    Recompute one cached day after a booking for it was written. The day
+    is read back from the database and stored under its own key, so
+    writes for other days can't overwrite it with an older copy.
+    """
+    bitmap = full_slot_bitmaps(service_id, day, day).get(day, 0)
+    cache.set(_day_key(service_id, day, _version()), bitmap, getattr(settings, 'AVAILABILITY_CACHE_TTL', 300))
+
+
+def invalidate_all():
+    """Drop every cached bitmap, e.g. after a booking moved to another day"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
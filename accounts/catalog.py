@@ -0,0 +1,60 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Services
+from .routers import PRIMARY
+from .serializers import ServicesSerializer
+
+
+VERSION_KEY = 'catalog:version'
+LAST_MODIFIED_KEY = 'catalog:last_modified'
+
+
+def _etag(data):
+    payload = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    return '"%s"' % hashlib.sha256(payload).hexdigest()[:32]
+
+
+def _build():
+    # Read from the primary so a lagging replica can't be cached under the new version
+    items = ServicesSerializer(Services.objects.using(PRIMARY).order_by('id'), many=True).data
+    items = [dict(item) for item in items]
+    return {
+        'items': items,
+        'etag': _etag(items),
+        'by_id': {item['id']: (item, _etag(item)) for item in items},
+        'last_modified': cache.get(LAST_MODIFIED_KEY) or timezone.now().replace(microsecond=0),
+    }
+
+
+def get_catalog():
+    """
+    The serialized services catalog with its ETag and Last-Modified, cached
+    under the current catalog version. Only a version bump reaches the DB.
+    """
+    version = cache.get_or_set(VERSION_KEY, 1, None)
+    key = f"catalog:{version}"
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = _build()
+        cache.set(key, catalog, getattr(settings, 'CATALOG_CACHE_TTL', 300))
+    return catalog
+
+
+def get_service(pk):
+    """(item, etag) for one service, or None"""
+    return get_catalog()['by_id'].get(int(pk))
+
+
+def invalidate():
+    """Called when a service is saved or deleted"""
+    cache.set(LAST_MODIFIED_KEY, timezone.now().replace(microsecond=0), None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
@@ -0,0 +1,27 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+
+from .search import index_exists, missing_triggers
+
+
+@register(Tags.database)
+def check_search_triggers(app_configs, databases=None, **kwargs):
+    """
+    The contact search index goes stale without its triggers, which SQLite
+    drops whenever a migration rebuilds accounts_contact. Runs with
+    `manage.py check --database default` and before migrate; a warning, so
+    it never blocks the migration that would fix things.
+    """
+    errors = []
+    for alias in databases or []:
+        connection = connections[alias]
+        if connection.vendor != 'sqlite' or not index_exists(connection):
+            continue
+        missing = missing_triggers(connection)
+        if missing:
+            errors.append(Warning(
+                f"Contact search triggers missing on '{alias}': {', '.join(missing)}",
+                hint="Run `manage.py rebuild_contact_search` to recreate them and re-index.",
+                id='accounts.W001',
+            ))
+    return errors
@@ -0,0 +1,240 @@
+import datetime
+import logging
+import threading
+import time
+from smtplib import SMTPException, SMTPServerDisconnected
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import OutboxEmail
+from .rendering import renderer
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, template_name, context, recipient_list, from_email=None):
+    """
+    Render an email and store it in the outbox.
+    Call this inside the same transaction as the record the email is about,
+    so the email is only queued if that record is committed.
+    """
+    plain_message, html_message = renderer.render(template_name, context)
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=plain_message,
+        html_body=html_message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+def build_message(email, connection=None):
+    """Build an EmailMultiAlternatives from an outbox row"""
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.recipients,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def backoff_delay(attempts):
+    """Exponential backoff between delivery attempts, capped"""
+    base = getattr(settings, 'OUTBOX_BACKOFF_SECONDS', 30)
+    cap = getattr(settings, 'OUTBOX_MAX_BACKOFF_SECONDS', 3600)
+    return datetime.timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def claim_batch(batch_size):
+    """
+    Lease a batch of due emails so that a second worker does not pick them up
+    while they are being sent. The lease is just a push of next_attempt_at.
+    """
+    now = timezone.now()
+    lease = datetime.timedelta(seconds=getattr(settings, 'OUTBOX_LEASE_SECONDS', 300))
+    with transaction.atomic():
+        ids = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        OutboxEmail.objects.filter(id__in=ids).update(next_attempt_at=now + lease)
+    return list(OutboxEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+class ConnectionPool:
+    """
+    A small pool of open mail connections shared by the outbox worker, so a
+    batch of emails (and the next batch) reuse the same authenticated SMTP
+    sessions instead of doing a TLS handshake and login per message.
+    """
+
+    def __init__(self, size=None, max_idle=None, backend=None):
+        self.size = size or getattr(settings, 'EMAIL_POOL_SIZE', 2)
+        self.max_idle = max_idle if max_idle is not None else getattr(settings, 'EMAIL_POOL_MAX_IDLE_SECONDS', 60)
+        self.backend = backend
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self._idle = []  # (connection, last_used) pairs ready for reuse
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _open(self):
+        connection = get_connection(self.backend, fail_silently=False)
+        connection.open()
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _checkout(self):
+        with self._lock:
+            item = self._idle.pop() if self._idle else None
+        if item is None:
+            return None
+        connection, last_used = item
+        if time.monotonic() - last_used > self.max_idle:
+            # Most relays drop idle sessions; reconnect now rather than on a failed send
+            self._close(connection)
+            return None
+        return connection
+
+    def _checkin(self, connection):
+        if connection is None:
+            return
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    def _send(self, connection, message):
+        """
+        Send one message and return the connection to reuse for the next.
+        On failure every connection this involved is closed before the
+        error is raised, so none is leaked.
+        """
+        try:
+            with metrics.timed('smtp'):
+                if connection is None:
+                    connection = self._open()
+                try:
+                    sent = connection.send_messages([message])
+                except SMTPServerDisconnected:
+                    # The server closed the session while it sat in the pool
+                    self._close(connection)
+                    connection = self._open()
+                    sent = connection.send_messages([message])
+            if not sent:
+                raise SMTPException("The mail backend did not send the message")
+        except Exception:
+            if connection is not None:
+                self._close(connection)
+            raise
+        with self._lock:
+            self.messages_sent += sent
+        return connection
+
+    def send_messages(self, messages):
+        """
+        Send related messages over one pooled connection.
+        Returns a list with None for each delivered message, or the exception
+        that stopped it, in the same order as `messages`.
+        """
+        results = []
+        with self._slots:
+            connection = self._checkout()
+            for message in messages:
+                try:
+                    connection = self._send(connection, message)
+                    results.append(None)
+                except Exception as e:
+                    # _send closed it; the next message gets a fresh connection
+                    connection = None
+                    results.append(e)
+            self._checkin(connection)
+        return results
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
+
+    def stats(self):
+        """Connections opened versus messages sent, to check the reuse ratio"""
+        with self._lock:
+            opened, sent = self.connections_opened, self.messages_sent
+        return {
+            'connections_opened': opened,
+            'messages_sent': sent,
+            'messages_per_connection': round(sent / opened, 2) if opened else 0.0,
+        }
+
+
+pool = ConnectionPool()
+
+
+def record_delivery(email, error=None):
+    """Record the outcome of one delivery attempt. Returns True on success."""
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+    email.attempts += 1
+    if error is not None:
+        email.last_error = str(error)
+        if email.attempts >= max_attempts:
+            email.status = OutboxEmail.DEAD
+            logger.error(f"Outbox email {email.id} dead after {email.attempts} attempts: {error}")
+        else:
+            email.next_attempt_at = timezone.now() + backoff_delay(email.attempts)
+            logger.warning(f"Outbox email {email.id} failed (attempt {email.attempts}): {error}")
+        email.save(update_fields=['attempts', 'status', 'next_attempt_at', 'last_error'])
+        return False
+
+    email.status = OutboxEmail.SENT
+    email.sent_at = timezone.now()
+    email.last_error = ''
+    email.save(update_fields=['attempts', 'status', 'sent_at', 'last_error'])
+    return True
+
+
+def deliver_pending(batch_size=50, connection_pool=None):
+    """
+    Send one batch of due emails through the shared connection pool.
+    Returns a (sent, failed) tuple.
+    """
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    connection_pool = connection_pool or pool
+    results = connection_pool.send_messages([build_message(email) for email in emails])
+
+    sent = failed = 0
+    for email, error in zip(emails, results):
+        if record_delivery(email, error):
+            sent += 1
+        else:
+            failed += 1
+    return sent, failed
+
+
+def requeue_dead():
+    """Move dead-lettered emails back to the pending queue"""
+    return OutboxEmail.objects.filter(status=OutboxEmail.DEAD).update(
+        status=OutboxEmail.PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+    )
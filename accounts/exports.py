@@ -0,0 +1,76 @@
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Booking, Contact
+
+
+# dataset -> (queryset factory, exported columns); columns are values_list() lookups
+DATASETS = {
+    'contacts': (
+        lambda: Contact.objects.order_by('id'),
+        ('id', 'name', 'email', 'phone', 'message', 'created_at', 'is_responded'),
+    ),
+    'bookings': (
+        lambda: Booking.objects.order_by('id'),
+        ('id', 'user__email', 'service__name', 'name', 'email', 'date', 'time', 'created_at'),
+    ),
+}
+
+FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def iter_rows(dataset, chunk_size=2000):
+    """Yield value tuples for a dataset without caching the queryset"""
+    queryset, columns = DATASETS[dataset]
+    return queryset().values_list(*columns).iterator(chunk_size=chunk_size)
+
+
+class _Line:
+    """File-like object that hands back what csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(dataset, rows):
+    _, columns = DATASETS[dataset]
+    writer = csv.writer(_Line())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(dataset, rows):
+    _, columns = DATASETS[dataset]
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_gzip(chunks):
+    """Incrementally gzip a stream of str chunks"""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip header and trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(dataset, fmt, compress=False, chunk_size=2000):
+    """
+    Generator of encoded export chunks. Memory use is bounded by chunk_size
+    rows whatever the table size.
+    """
+    rows = iter_rows(dataset, chunk_size)
+    lines = iter_csv(dataset, rows) if fmt == 'csv' else iter_ndjson(dataset, rows)
+    if compress:
+        return iter_gzip(lines)
+    return (line.encode() for line in lines)
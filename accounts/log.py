@@ -0,0 +1,142 @@
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed in `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def set_request_id(value):
+    return _request_id.set(value)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def request_id():
+    return _request_id.get()
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id and any extras"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(
+                timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BackgroundFileHandler(QueueHandler):
+    """
+    Logging handler that only puts records on an in-memory queue. A writer
+    thread formats them as JSON lines and writes them to a size-rotated
+    file, so the request thread never waits on disk I/O. When
+    the queue is full, records are dropped and counted instead of blocking.
+    flush() and close() wait at most `timeout` seconds for the writer, so a
+    dead or stuck writer can't hang them (or interpreter shutdown).
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, queue_size=10000, timeout=5.0):
+        filename = os.fspath(filename)
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        self.file_handler = RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True
+        )
+        self.file_handler.setFormatter(JSONFormatter())
+        super().__init__(queue.Queue(queue_size))
+        self.dropped = 0
+        self.stopped = False
+        self.timeout = timeout
+        self.writer = threading.Thread(target=self.write_records, name='log-writer', daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def write_records(self):
+        # What QueueListener does, but with a thread this handler owns, so
+        # flush() and close() can see whether it is still alive
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    return
+                self.file_handler.handle(record)
+            finally:
+                self.queue.task_done()
+
+    def prepare(self, record):
+        # Runs in the thread that logged: resolve everything that depends on it
+        # (message args, exception, request id) before the record is queued
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = self.file_handler.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if not getattr(record, 'request_id', None):
+            record.request_id = request_id()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def wait_for_writer(self):
+        """
+        Wait until every queued record has been written, the writer thread
+        has died, or `timeout` runs out. Returns whether the queue drained.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.writer.is_alive():
+                    return False
+                self.queue.all_tasks_done.wait(min(remaining, 0.1))
+        return True
+
+    def flush(self):
+        """Wait (up to `timeout`) until every queued record has been written"""
+        if not self.stopped:
+            self.wait_for_writer()
+        self.file_handler.flush()
+
+    def close(self):
+        if not self.stopped:
+            self.stopped = True
+            if self.wait_for_writer() and self.writer.is_alive():
+                try:
+                    self.queue.put_nowait(None)  # tells the writer to stop
+                except queue.Full:
+                    pass
+                self.writer.join(self.timeout)
+            else:
+                self.dropped += self.queue.qsize()
+        self.file_handler.close()
+        super().close()
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.archive import archive_contacts, retention_cutoff, verify_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move contact submissions older than the retention window into gzipped "
+        "NDJSON files under ARCHIVE_DIR, in batches that each commit on their own. "
+        "Safe to stop and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Retention window (default CONTACT_RETENTION_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches")
+        parser.add_argument('--verify', action='store_true', help="Only check every archive file's checksum")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            problems = verify_archive()
+            for batch, error in problems:
+                self.stderr.write(f"{batch.path}: {error}")
+            if problems:
+                raise CommandError(f"{len(problems)} archive file(s) failed verification")
+            self.stdout.write("All archive files match their checksums")
+            return
+
+        cutoff = retention_cutoff(options['days'])
+        total = archive_contacts(
+            cutoff,
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            progress=lambda count: self.stdout.write(f"Archived {count} contact(s)"),
+        )
+        self.stdout.write(f"Archived {total} contact(s) created before {cutoff:%Y-%m-%d %H:%M}")
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from accounts.models import User
+
+
+ENDPOINTS = {
+    # name: (sync path, async path, request body for request i)
+    'contact': ('/api/contact/', '/api/async/contact/', lambda i: {
+        'name': 'Bench Client', 'email': 'bench@example.com', 'message': f'Benchmark submission message {i}',
+    }),
+    'login': ('/api/login/', '/api/async/login/', lambda i: {
+        'email': 'bench-login@example.com', 'password': 'bench-password',
+    }),
+}
+
+# Without these the rate limits and duplicate-contact check turn most of the
+# load into 429s, and the comparison measures the throttle instead of the views
+BENCH_SETTINGS = dict(RATE_LIMITS={}, CONTACT_DEDUP_SECONDS=0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent throughput of the sync views through the WSGI handler "
+        "with the async views through the ASGI handler, on a throwaway test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), action='append')
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(**BENCH_SETTINGS):
+                self.run_all(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_all(self, options):
+        User.objects.create_user(email='bench-login@example.com', password='bench-password')
+        offset = 0
+        for name in options['endpoint'] or sorted(ENDPOINTS):
+            sync_path, async_path, body = ENDPOINTS[name]
+            for label, runner, path in (('WSGI', self.run_wsgi, sync_path), ('ASGI', self.run_asgi, async_path)):
+                # Each run gets its own range of request numbers, so no body repeats across runs
+                elapsed, statuses = runner(path, body, offset, options['requests'], options['concurrency'])
+                offset += options['requests']
+                failed = sorted({status for status in statuses if not 200 <= status < 300})
+                if failed:
+                    raise CommandError(f"{name} {label}: got non-2xx statuses {failed}; timings would be meaningless")
+                self.stdout.write(
+                    f"{name:8} {label}  {options['requests'] / elapsed:8.1f} req/s  "
+                    f"{elapsed * 1000 / options['requests']:7.2f} ms/req  statuses {sorted(set(statuses))}"
+                )
+
+    def run_wsgi(self, path, body, offset, requests, concurrency):
+        def call(i):
+            try:
+                return Client().post(path, body(i), content_type='application/json').status_code
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            statuses = list(pool.map(call, range(offset, offset + requests)))
+        return time.perf_counter() - started, statuses
+
+    def run_asgi(self, path, body, offset, requests, concurrency):
+        async def main():
+            limit = asyncio.Semaphore(concurrency)
+            client = AsyncClient()
+
+            async def call(i):
+                async with limit:
+                    response = await client.post(path, body(i), content_type='application/json')
+                    return response.status_code
+
+            return await asyncio.gather(*(call(i) for i in range(offset, offset + requests)))
+
+        started = time.perf_counter()
+        statuses = asyncio.run(main())
+        return time.perf_counter() - started, statuses
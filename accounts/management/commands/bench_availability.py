@@ -0,0 +1,83 @@
+import datetime
+import random
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts import availability
+from accounts.models import Booking, Services, User
+
+
+# Its own cache, so invalidate_all() doesn't bump the version the live app reads
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-availability',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark slot availability over a long range, on a throwaway test database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--fill', type=float, default=0.5, help="Fraction of seats to book")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(CACHES=BENCH_CACHES):
+                self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        rng = random.Random(0)
+        capacity = availability.slot_capacity()
+        # One client per seat, since a client can book a slot only once
+        users = [User.objects.create(email=f'bench-availability-{seat}@example.com') for seat in range(capacity)]
+        service = Services.objects.create(name='Availability benchmark', price=1)
+        start = timezone.localdate() + datetime.timedelta(days=1)
+        end = start + datetime.timedelta(days=options['days'] - 1)
+
+        bookings = []
+        day = start
+        while day <= end:
+            for slot in availability.SLOTS:
+                for seat, user in enumerate(users):
+                    if rng.random() < options['fill']:
+                        bookings.append(Booking(user=user, service=service, name='Bench', date=day, time=slot, seat=seat))
+            day += datetime.timedelta(days=1)
+        Booking.objects.bulk_create(bookings, batch_size=1000)
+        self.stdout.write(f"{len(bookings)} bookings over {options['days']} days, {capacity} per slot")
+
+        def per_day():
+            # What a query-per-day implementation would do
+            day, result = start, []
+            while day <= end:
+                booked = Counter(Booking.objects.filter(service=service, date=day).values_list('time', flat=True))
+                result.append((day, [slot for slot in availability.SLOTS if booked[slot] < capacity]))
+                day += datetime.timedelta(days=1)
+            return result
+
+        def cold():
+            availability.invalidate_all()
+            return availability.free_slots(service.id, start, end)
+
+        def warm():
+            return availability.free_slots(service.id, start, end)
+
+        if per_day() != cold():
+            raise CommandError("Aggregated availability differs from the query-per-day result")
+        for label, fn in (('query per day', per_day), ('aggregated, cold cache', cold), ('aggregated, warm cache', warm)):
+            began = time.perf_counter()
+            for _ in range(options['repeat']):
+                fn()
+            elapsed = (time.perf_counter() - began) / options['repeat']
+            self.stdout.write(f"{label:25} {elapsed * 1000:8.2f} ms")
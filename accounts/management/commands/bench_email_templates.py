@@ -0,0 +1,41 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import Booking, Contact, Services, User
+from accounts.rendering import benchmark
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark render time per email template (cached renderer vs render_to_string + strip_tags)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        contact = Contact(
+            name='Jane Client',
+            email='jane@example.com',
+            phone='0970000000',
+            message='I need advice on a land dispute.\nPlease call me back.',
+            created_at=timezone.now(),
+        )
+        user = User(first_name='Jane', last_name='Client', email='jane@example.com')
+        service = Services(name='Consultation', price=100)
+        booking = Booking(user=user, service=service, name='Jane Client',
+                          date=datetime.date.today(), time='10:00')
+        booking_context = {'booking': booking, 'user': user, 'service': service, 'site_url': 'localhost'}
+
+        results = benchmark({
+            'emails/contact_notification.html': {'contact': contact},
+            'emails/client_confirmation.html': {'contact': contact},
+            'emails/booking_confirmation.html': booking_context,
+            'emails/admin_booking_notification.html': booking_context,
+        }, iterations=options['iterations'])
+
+        for template_name, timing in results.items():
+            self.stdout.write(
+                f"{template_name:45} baseline {timing['baseline_us']:8.1f}us  "
+                f"cached {timing['cached_us']:8.1f}us"
+            )
@@ -0,0 +1,257 @@
+import datetime
+import io
+import json
+import platform
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test.utils import override_settings
+
+from .generate_data import EMAIL_DOMAIN
+
+
+# name: (method, path, needs a logged-in user)
+ENDPOINTS = {
+    'login': ('POST', '/api/login/', False),
+    'register': ('POST', '/api/register/', False),
+    'user': ('GET', '/api/user/', True),
+    'services': ('GET', '/api/services/', False),
+    'bookings': ('GET', '/api/bookings/', True),
+    'contact': ('POST', '/api/contact/', False),
+}
+
+# Settings for the in-process server: no mail leaves the machine, and the
+# rate limits and duplicate-contact check don't turn the load into 429s
+BENCH_SETTINGS = dict(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    RATE_LIMITS={},
+    CONTACT_DEDUP_SECONDS=0,
+    DEBUG=False,
+    ALLOWED_HOSTS=['127.0.0.1', 'localhost'],
+)
+
+SQL_QUERIES = re.compile(r'sql;[^,]*desc="(\d+) queries"')
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def sql_queries(server_timing):
+    """Query count from MetricsMiddleware's Server-Timing header (no sql entry means none ran)"""
+    match = SQL_QUERIES.search(server_timing or '')
+    return int(match.group(1)) if match else 0
+
+
+def summarize(name, concurrency, elapsed, samples):
+    """samples: (status, seconds, sql queries) per request"""
+    latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+    queries = [count for _, _, count in samples]
+    statuses = {}
+    for status, _, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'endpoint': name,
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': sum(1 for status, _, _ in samples if status >= 400),
+        'statuses': statuses,
+        'throughput': round(len(samples) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'sql_queries_mean': round(sum(queries) / len(queries), 2),
+        'sql_queries_max': max(queries),
+    }
+
+
+def find_regressions(results, baseline, threshold, metric='p95_ms'):
+    """
+    Human-readable regressions of `results` against a saved baseline: the
+    latency metric grew by more than `threshold` (0.2 = 20%), or a request
+    ran more queries than it used to. Endpoints missing from the baseline
+    are skipped.
+    """
+    previous = {(row['endpoint'], row['concurrency']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        old = previous.get((row['endpoint'], row['concurrency']))
+        if old is None:
+            continue
+        label = f"{row['endpoint']} (concurrency {row['concurrency']})"
+        if row[metric] > old[metric] * (1 + threshold):
+            regressions.append(f"{label}: {metric} {old[metric]} -> {row[metric]}")
+        if row['sql_queries_max'] > old['sql_queries_max']:
+            regressions.append(f"{label}: SQL queries {old['sql_queries_max']} -> {row['sql_queries_max']}")
+        if row['errors'] > old['errors']:
+            regressions.append(f"{label}: errors {old['errors']} -> {row['errors']}")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the public API over real HTTP: throughput, p50/p95/p99 latency "
+        "and SQL queries per request for each endpoint. By default the app is served "
+        "in-process from a throwaway database filled by generate_data, with mail "
+        "going to the locmem backend; --url points it at a running server instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), action='append')
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per endpoint")
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--concurrency', default='1,8', help="Comma-separated client thread counts")
+        parser.add_argument('--url', help="Base URL of a running server (its own rate limits apply)")
+        parser.add_argument('--email', default=f'user0000000@{EMAIL_DOMAIN}')
+        parser.add_argument('--password', default='load-test-password')
+        parser.add_argument('--users', type=int, default=500, help="generate_data size for the in-process server")
+        parser.add_argument('--bookings', type=int, default=5000)
+        parser.add_argument('--contacts', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="Compare against the JSON results of an earlier run")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Allowed slowdown against the baseline (0.2 = 20%%)")
+        parser.add_argument('--metric', choices=('p50_ms', 'p95_ms', 'p99_ms'), default='p95_ms')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        if options['url']:
+            results = self.run_all(options['url'].rstrip('/'), options)
+        else:
+            results = self.run_local(options)
+
+        report = {
+            'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'target': options['url'] or 'in-process',
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = find_regressions(results, baseline, options['threshold'], options['metric'])
+            if regressions:
+                raise CommandError("Slower than the baseline:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def run_local(self, options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(**BENCH_SETTINGS):
+                call_command('generate_data', users=options['users'], services=12, bookings=options['bookings'],
+                             contacts=options['contacts'], seed=options['seed'], password=options['password'],
+                             stdout=io.StringIO())
+                server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=False)
+                server.set_app(get_wsgi_application())
+                thread = threading.Thread(target=server.serve_forever, daemon=True)
+                thread.start()
+                try:
+                    return self.run_all(f'http://127.0.0.1:{server.server_port}', options)
+                finally:
+                    server.shutdown()
+                    server.server_close()
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_all(self, base_url, options):
+        token = self.log_in(base_url, options['email'], options['password'])
+        # Unique per run, so registrations and contacts never collide with an earlier run's
+        run = uuid.uuid4().hex[:8]
+        results = []
+        self.stdout.write(
+            f"{'endpoint':10} {'conc':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql':>5} {'errors':>6}"
+        )
+        for name in options['endpoint'] or list(ENDPOINTS):
+            for concurrency in [int(value) for value in options['concurrency'].split(',')]:
+                request = self.make_request(base_url, name, token, options, f'{run}-{concurrency}')
+                for i in range(options['warmup']):
+                    request(f'w{i}')
+                elapsed, samples = self.drive(request, options['requests'], concurrency)
+                row = summarize(name, concurrency, elapsed, samples)
+                results.append(row)
+                self.stdout.write(
+                    f"{name:10} {concurrency:4d} {row['throughput']:8.1f} {row['p50_ms']:8.2f} {row['p95_ms']:8.2f} "
+                    f"{row['p99_ms']:8.2f} {row['sql_queries_mean']:5.1f} {row['errors']:6d}"
+                )
+        return results
+
+    def log_in(self, base_url, email, password):
+        status, headers = self.send(base_url + '/api/login/', 'POST', {'email': email, 'password': password})
+        cookies = SimpleCookie()
+        for header in headers.get_all('Set-Cookie') or []:
+            cookies.load(header)
+        if status != 200 or 'jwt' not in cookies:
+            raise CommandError(f"Could not log in as {email} (status {status}); check --email/--password")
+        return cookies['jwt'].value
+
+    def make_request(self, base_url, name, token, options, run):
+        """A callable(i) that sends request i to the endpoint and returns (status, seconds, sql queries)"""
+        method, path, needs_auth = ENDPOINTS[name]
+        headers = {'Authorization': f'Bearer {token}'} if needs_auth else {}
+
+        def body(i):
+            if name == 'login':
+                return {'email': options['email'], 'password': options['password']}
+            if name == 'register':
+                return {'email': f'bench-{run}-{i}@example.com', 'password': 'bench-password',
+                        'first_name': 'Bench', 'last_name': 'Client'}
+            if name == 'contact':
+                return {'name': 'Bench Client', 'email': f'bench-{run}@example.com',
+                        'message': f'Benchmark message {run}-{i} about a land title.'}
+            return None
+
+        def request(i):
+            started = time.perf_counter()
+            status, response_headers = self.send(base_url + path, method, body(i), headers)
+            return status, time.perf_counter() - started, sql_queries(response_headers.get('Server-Timing'))
+
+        return request
+
+    def send(self, url, method, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(url, data=data, method=method, headers=dict(headers or {}))
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                return response.status, response.headers
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code, error.headers
+
+    def drive(self, request, count, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(request, range(count)))
+        return time.perf_counter() - started, samples
@@ -0,0 +1,86 @@
+import datetime
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection as default_connection
+
+from accounts.models import Contact
+
+
+def partial_index():
+    """The model's own index definition, so the benchmark follows any change to it"""
+    return next(index for index in Contact._meta.indexes if index.name == 'contact_unresponded_idx')
+
+
+class Command(BaseCommand):
+    help = (
+        "Inbox page load time as answered messages pile up, with and without "
+        "the partial index on unresponded contacts (throwaway SQLite files)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000', help="Comma-separated total row counts")
+        parser.add_argument('--unresponded', type=int, default=1000, help="Backlog size, kept constant")
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if default_connection.vendor != 'sqlite':
+            raise CommandError("bench_inbox measures SQLite")
+        # The SQL the inbox view runs for its first page (25 rows plus one to detect a next page)
+        sql, params = Contact.objects.filter(is_responded=False).order_by('created_at', 'id')[:26].query.sql_with_params()
+
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(f"{'rows':>10} {'answered':>10} {'partial index':>15} {'without':>12}")
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                connection = self.populate(os.path.join(directory, 'inbox.sqlite3'), size, options['unresponded'])
+                without = self.time_query(connection, sql, params, options['repeat'])
+                with connection.schema_editor() as editor:
+                    editor.add_index(Contact, partial_index())
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                with_index = self.time_query(connection, sql, params, options['repeat'])
+                connection.close()
+            self.stdout.write(
+                f"{size:10d} {size - options['unresponded']:10d} {with_index * 1000:13.3f}ms {without * 1000:10.3f}ms"
+            )
+
+    def populate(self, path, size, unresponded):
+        # A connection like the default one, but to a throwaway file. The
+        # table comes from the model; the partial index is added back later
+        connection = default_connection.__class__({**default_connection.settings_dict, 'NAME': path}, alias='bench_inbox')
+        with connection.schema_editor() as editor:
+            editor.create_model(Contact)
+        with connection.schema_editor() as editor:
+            # The indexes only exist once the first editor has exited
+            editor.remove_index(Contact, partial_index())
+        start = datetime.datetime(2020, 1, 1)
+        # Older messages have been answered; the newest `unresponded` are waiting
+        rows = (
+            (f"Client {i}", f"c{i}@example.com", "Please call me about my case",
+             (start + datetime.timedelta(minutes=i)).isoformat(sep=' '), i < size - unresponded)
+            for i in range(size)
+        )
+        with connection.cursor() as cursor:
+            # One transaction, rather than one per row in autocommit mode
+            cursor.execute('BEGIN')
+            cursor.executemany(
+                "INSERT INTO accounts_contact (name, email, message, created_at, is_responded) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+            cursor.execute('COMMIT')
+            cursor.execute('ANALYZE')
+        return connection
+
+    def time_query(self, connection, sql, params, repeat):
+        best = float('inf')
+        with connection.cursor() as cursor:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                best = min(best, time.perf_counter() - started)
+        return best
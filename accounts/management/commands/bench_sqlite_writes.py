@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.sqlite import pragma_statements
+
+
+SCHEMA = """
+CREATE TABLE booking (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    seat INTEGER NOT NULL,
+    UNIQUE (service_id, date, time, seat)
+)
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Write-contention benchmark: concurrent booking-style transactions against "
+        "SQLite with the default settings versus the SQLITE_PRAGMAS profile"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help="Transactions per thread")
+        parser.add_argument('--readers', type=int, default=2, help="Threads running reads alongside")
+
+    def handle(self, *args, **options):
+        profiles = (
+            # label, pragmas, BEGIN statement
+            ('default (rollback journal, deferred)', [], 'BEGIN'),
+            ('tuned (SQLITE_PRAGMAS, immediate)', pragma_statements(), 'BEGIN IMMEDIATE'),
+        )
+        for label, pragmas, begin in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                result = self.run(path, pragmas, begin, options)
+            self.stdout.write(
+                f"{label:40} {result['commits'] / result['elapsed']:8.1f} commits/s  "
+                f"{result['locked']:5d} 'database is locked' errors  "
+                f"{result['reads']:6d} reads"
+            )
+
+    def connect(self, path, pragmas):
+        # isolation_level=None: we issue BEGIN ourselves, as Django does
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        for statement in pragmas:
+            connection.execute(statement)
+        return connection
+
+    def run(self, path, pragmas, begin, options):
+        setup = self.connect(path, pragmas)
+        setup.execute(SCHEMA)
+        setup.close()
+
+        counts = {'commits': 0, 'locked': 0, 'reads': 0}
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def writer(worker):
+            connection = self.connect(path, pragmas)
+            for i in range(options['writes']):
+                try:
+                    # Read then write, like a booking that checks its slot first
+                    connection.execute(begin)
+                    connection.execute(
+                        "SELECT COUNT(*) FROM booking WHERE service_id = ? AND date = ?", (worker, i)
+                    ).fetchone()
+                    connection.execute(
+                        "INSERT INTO booking (service_id, date, time, seat) VALUES (?, ?, '10:00', 0)",
+                        (worker, i),
+                    )
+                    connection.execute('COMMIT')
+                    with lock:
+                        counts['commits'] += 1
+                except sqlite3.OperationalError as e:
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+                    if 'locked' not in str(e):
+                        raise
+                    with lock:
+                        counts['locked'] += 1
+            connection.close()
+
+        def reader():
+            connection = self.connect(path, pragmas)
+            while not done.is_set():
+                try:
+                    connection.execute("SELECT COUNT(*) FROM booking").fetchone()
+                    with lock:
+                        counts['reads'] += 1
+                except sqlite3.OperationalError:
+                    pass
+            connection.close()
+
+        readers = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        writers = [threading.Thread(target=writer, args=(n,)) for n in range(options['threads'])]
+        for thread in readers:
+            thread.start()
+        started = time.perf_counter()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        counts['elapsed'] = time.perf_counter() - started
+        done.set()
+        for thread in readers:
+            thread.join()
+        return counts
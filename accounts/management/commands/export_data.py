@@ -0,0 +1,38 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+
+from accounts.exports import DATASETS, FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream contact submissions or bookings to a CSV/NDJSON file in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', dest='fmt', choices=FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help="File to write (defaults to stdout)")
+        parser.add_argument('--gzip', action='store_true', help="Compress the output")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunks = stream_export(options['dataset'], options['fmt'], chunk_size=options['chunk_size'])
+        if options['output']:
+            opener = gzip.open if options['gzip'] else open
+            out = opener(options['output'], 'wb')
+        elif options['gzip']:
+            out = gzip.open(sys.stdout.buffer, 'wb')
+        else:
+            out = sys.stdout.buffer
+
+        rows = -1 if options['fmt'] == 'csv' else 0  # don't count the CSV header
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                rows += 1
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        if options['output']:
+            self.stdout.write(f"Exported {max(rows, 0)} {options['dataset']} row(s) to {options['output']}")
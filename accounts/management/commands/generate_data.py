@@ -0,0 +1,239 @@
+import datetime
+import hashlib
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import availability, catalog
+from accounts.models import Booking, Contact, Services, User
+
+
+EMAIL_DOMAIN = 'loadtest.invalid'
+SERVICE_PREFIX = 'Load test: '
+
+FIRST_NAMES = ('Chipo', 'Mwila', 'Bwalya', 'Natasha', 'Joseph', 'Grace', 'Peter', 'Ruth', 'Daniel', 'Esther',
+               'Kelvin', 'Mercy', 'Brian', 'Precious', 'Moses', 'Agnes', 'Isaac', 'Lydia', 'John', 'Mary')
+LAST_NAMES = ('Phiri', 'Banda', 'Mulenga', 'Tembo', 'Zulu', 'Mwanza', 'Sakala', 'Lungu', 'Daka', 'Ngoma',
+              'Chanda', 'Mumba', 'Kunda', 'Musonda', 'Mbewe', 'Kabwe', 'Chola', 'Njobvu', 'Soko', 'Nkhata')
+SERVICES = ('Consultation', 'Conveyancing', 'Divorce and family', 'Employment dispute', 'Estate planning',
+            'Company registration', 'Contract review', 'Debt recovery', 'Immigration', 'Criminal defence',
+            'Land disputes', 'Intellectual property')
+TOPICS = ('a lease agreement', 'my employment contract', 'a land title', 'a divorce settlement',
+          'registering a company', 'a debt owed to me', 'my late father\'s estate', 'a work permit',
+          'an unfair dismissal', 'a trademark', 'a road accident claim', 'a tenancy deposit')
+OPENINGS = ('I need advice about', 'Could you help me with', 'I would like a consultation on',
+            'Please call me regarding', 'What are my options concerning')
+
+
+def hash_password(args):
+    password, salt = args
+    return make_password(password, salt)
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Let bulk_create keep the generated created_at instead of auto_now_add's now()"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    try:
+        for field in fields:
+            field.auto_now_add = False
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset (users, services, bookings, "
+        "contacts) for load testing. The same --seed and --anchor give the same rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--services', type=int, default=12)
+        parser.add_argument('--bookings', type=int, default=10000)
+        parser.add_argument('--contacts', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--anchor', help="Date the data is generated around, YYYY-MM-DD (default today)")
+        parser.add_argument('--password', default='load-test-password', help="Password of every generated user")
+        parser.add_argument('--hashes', type=int, default=16,
+                            help="Distinct password hashes (different salts) shared out among the users")
+        parser.add_argument('--hash-workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--fill', type=float, default=0.5, help="Fraction of booking slots taken")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--replace', action='store_true', help="Delete previously generated data first")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.anchor = (datetime.date.fromisoformat(options['anchor']) if options['anchor']
+                       else timezone.localdate())
+
+        if User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').exists():
+            if not options['replace']:
+                raise CommandError("Generated data already exists; pass --replace to regenerate it")
+            self.delete_generated()
+
+        started = time.monotonic()
+        hashes = self.hash_passwords(options)
+        user_ids = self.create_users(options['users'], hashes)
+        service_ids = self.create_services(options['services'])
+        self.create_bookings(options['bookings'], user_ids, service_ids, options['fill'])
+        self.create_contacts(options['contacts'])
+
+        # bulk_create sends no signals, so drop what the caches hold
+        availability.invalidate_all()
+        catalog.invalidate()
+        self.stdout.write(f"Done in {time.monotonic() - started:.1f}s")
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def delete_generated(self):
+        with transaction.atomic():
+            Contact.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+            Booking.objects.filter(user__email__endswith=f'@{EMAIL_DOMAIN}').delete()
+            Services.objects.filter(name__startswith=SERVICE_PREFIX).delete()
+            User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        self.log("Deleted the previously generated data")
+
+    def hash_passwords(self, options):
+        """
+        PBKDF2 is far too slow to hash millions of passwords, so a few hashes
+        with different (seeded) salts are computed in a process pool and
+        shared out. Every user still logs in with --password.
+        """
+        jobs = [
+            (options['password'], hashlib.sha256(f"{options['seed']}:{i}".encode()).hexdigest()[:22])
+            for i in range(max(options['hashes'], 1))
+        ]
+        started = time.monotonic()
+        if options['hash_workers'] > 1:
+            with ProcessPoolExecutor(max_workers=options['hash_workers'], initializer=django.setup) as pool:
+                hashes = list(pool.map(hash_password, jobs))
+        else:
+            hashes = [hash_password(job) for job in jobs]
+        self.log(f"Hashed {len(hashes)} password(s) in {time.monotonic() - started:.1f}s")
+        return hashes
+
+    def batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def create_users(self, count, hashes):
+        rng = self.rng
+        joined = timezone.make_aware(datetime.datetime.combine(self.anchor, datetime.time(9)))
+
+        def rows():
+            for i in range(count):
+                yield User(
+                    email=f'user{i:07d}@{EMAIL_DOMAIN}',
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    phone_number=f'+2609{rng.randrange(10 ** 8):08d}',
+                    password=hashes[i % len(hashes)],
+                    is_staff=i == 0,  # user0000000 can use the staff endpoints
+                    date_joined=joined - datetime.timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)),
+                )
+
+        for batch in self.batches(rows()):
+            User.objects.bulk_create(batch)
+        self.log(f"Created {count} users")
+        return list(
+            User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').order_by('email').values_list('id', flat=True)
+        )
+
+    def create_services(self, count):
+        services = []
+        for i in range(count):
+            name = SERVICES[i % len(SERVICES)]
+            if i >= len(SERVICES):
+                name = f"{name} {i // len(SERVICES) + 1}"
+            services.append(Services(name=f"{SERVICE_PREFIX}{name}", price=self.rng.randrange(50, 1000)))
+        Services.objects.bulk_create(services)
+        self.log(f"Created {count} services")
+        return list(
+            Services.objects.filter(name__startswith=SERVICE_PREFIX).order_by('name').values_list('id', flat=True)
+        )
+
+    def create_bookings(self, count, user_ids, service_ids, fill):
+        """
+        Walk the slot grid day by day around the anchor date and take each
+        slot's seats with probability `fill`. A slot's seats go to distinct
+        users, so neither (user, date, time, service) nor the seat
+        constraint can collide.
+        """
+        if not count:
+            return
+        rng = self.rng
+        capacity = min(availability.slot_capacity(), len(user_ids))
+        slots = availability.SLOTS
+        per_day = len(service_ids) * len(slots) * capacity * fill
+        days = math.ceil(count / per_day) if per_day else 0
+        if not days or not user_ids:
+            raise CommandError("Not enough users, services or --fill to place the bookings")
+        first_day = self.anchor - datetime.timedelta(days=days // 2)
+
+        def rows():
+            made = 0
+            day = first_day
+            while made < count:
+                for service_id in service_ids:
+                    for slot in slots:
+                        taken = sum(1 for _ in range(capacity) if rng.random() < fill)
+                        for seat, user_id in enumerate(rng.sample(user_ids, taken)):
+                            if made >= count:
+                                return
+                            made += 1
+                            yield Booking(
+                                user_id=user_id, service_id=service_id, name=f'{rng.choice(FIRST_NAMES)} '
+                                f'{rng.choice(LAST_NAMES)}', email=None, date=day, time=slot, seat=seat,
+                                created_at=timezone.make_aware(datetime.datetime.combine(
+                                    day - datetime.timedelta(days=rng.randrange(1, 30)), datetime.time(12))),
+                            )
+                day += datetime.timedelta(days=1)
+
+        with explicit_created_at(Booking):
+            for batch in self.batches(rows()):
+                Booking.objects.bulk_create(batch)
+        self.log(f"Created {count} bookings over {days} days from {first_day}")
+
+    def create_contacts(self, count):
+        rng = self.rng
+        end = timezone.make_aware(datetime.datetime.combine(self.anchor, datetime.time(18)))
+        span = 2 * 365 * 24 * 3600  # two years back
+
+        def rows():
+            for i in range(count):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                age = rng.randrange(span)
+                yield Contact(
+                    name=f'{first} {last}',
+                    email=f'{first.lower()}.{last.lower()}.{i}@{EMAIL_DOMAIN}',
+                    phone=f'+2609{rng.randrange(10 ** 8):08d}' if rng.random() < 0.7 else None,
+                    message=f"{rng.choice(OPENINGS)} {rng.choice(TOPICS)}. " * rng.randint(1, 4),
+                    created_at=end - datetime.timedelta(seconds=age),
+                    # Older messages have almost all been answered
+                    is_responded=rng.random() < min(0.98, age / (30 * 24 * 3600)),
+                )
+
+        with explicit_created_at(Contact):
+            for batch in self.batches(rows()):
+                Contact.objects.bulk_create(batch)
+        self.log(f"Created {count} contacts")
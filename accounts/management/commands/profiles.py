@@ -0,0 +1,64 @@
+import io
+import os
+import pstats
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.profiling import list_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        "List the request profiles captured by ProfilingMiddleware, summarize "
+        "them per route, or print the hottest functions of one or more profiles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Profile files (or name prefixes) to print stats for")
+        parser.add_argument('--route', help="Only profiles whose route contains this text")
+        parser.add_argument('--summary', action='store_true', help="Count and timings per route")
+        parser.add_argument('--sort', default='cumulative', help="pstats sort key (cumulative, tottime, ...)")
+        parser.add_argument('--limit', type=int, default=25, help="Functions to print per profile")
+
+    def handle(self, *args, **options):
+        profiles = list_profiles()
+        if options['route']:
+            profiles = [profile for profile in profiles if options['route'] in profile.route]
+
+        if options['names']:
+            selected = [
+                profile for profile in profiles
+                if any(os.path.basename(profile.path).startswith(os.path.basename(name)) for name in options['names'])
+            ]
+            if not selected:
+                raise CommandError("No matching profiles")
+            for profile in selected:
+                self.print_stats(profile, options['sort'], options['limit'])
+        elif options['summary']:
+            self.print_summary(profiles)
+        else:
+            for profile in profiles:
+                self.stdout.write(
+                    f"{os.path.basename(profile.path):70} {profile.route:30} {profile.ms:7d}ms  {profile.kind}"
+                )
+            self.stdout.write(f"{len(profiles)} profile(s)")
+
+    def print_summary(self, profiles):
+        by_route = defaultdict(list)
+        for profile in profiles:
+            by_route[profile.route].append(profile.ms)
+        self.stdout.write(f"{'route':30} {'count':>6} {'mean ms':>9} {'max ms':>9}")
+        for route, timings in sorted(by_route.items(), key=lambda item: -max(item[1])):
+            self.stdout.write(
+                f"{route:30} {len(timings):6d} {sum(timings) / len(timings):9.0f} {max(timings):9d}"
+            )
+
+    def print_stats(self, profile, sort, limit):
+        self.stdout.write(f"== {os.path.basename(profile.path)} ({profile.kind}, {profile.ms}ms)")
+        if profile.kind == 'stack':
+            self.stdout.write("   call counts are samples; times are samples x sampling interval")
+        output = io.StringIO()
+        stats = pstats.Stats(profile.path, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        self.stdout.write(output.getvalue())
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from accounts.auth import prune_refresh_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired and revoked refresh token records"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {prune_refresh_tokens()} refresh token(s)")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts.search import index_exists, missing_triggers, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over contact submissions in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError("The contact search index uses SQLite FTS5")
+        if not index_exists(connection):
+            raise CommandError("The contact search index does not exist; run migrate")
+        for name in missing_triggers(connection):
+            self.stdout.write(f"Recreating missing trigger {name}")
+
+        started = time.monotonic()
+        indexed = rebuild_index(
+            batch_size=options['batch_size'],
+            using=options['database'],
+            progress=lambda count: self.stdout.write(f"Indexed {count} contact(s)"),
+        )
+        self.stdout.write(f"Rebuilt the index over {indexed} contact(s) in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,65 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import metrics
+from accounts.emails import deliver_pending, pool, requeue_dead
+
+
+SMTP_LABELS = (('phase', 'smtp'),)
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued emails from the outbox, retrying failures with backoff. "
+        "SMTP time is recorded in this process, not the web workers behind "
+        "/api/metrics: it is printed per batch and, with --metrics-file, written "
+        "out in the Prometheus text format."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the due emails once and exit")
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the outbox is empty")
+        parser.add_argument('--requeue-dead', action='store_true', help="Move dead-lettered emails back to pending first")
+        parser.add_argument('--metrics-file',
+                            help="Rewrite this file with the worker's metrics after each batch "
+                                 "(e.g. for node_exporter's textfile collector)")
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            count = requeue_dead()
+            self.stdout.write(f"Requeued {count} dead email(s)")
+
+        try:
+            while True:
+                smtp_before, calls_before = metrics.registry.histogram('phase_duration_seconds', SMTP_LABELS)
+                sent, failed = deliver_pending(options['batch_size'])
+                if sent or failed:
+                    smtp_after, calls_after = metrics.registry.histogram('phase_duration_seconds', SMTP_LABELS)
+                    calls = calls_after - calls_before
+                    smtp_ms = (smtp_after - smtp_before) * 1000
+                    stats = pool.stats()
+                    self.stdout.write(
+                        f"Sent {sent}, failed {failed} "
+                        f"({stats['connections_opened']} connection(s) opened for "
+                        f"{stats['messages_sent']} message(s)); "
+                        f"SMTP {smtp_ms:.1f} ms over {calls} send(s)"
+                        + (f", {smtp_ms / calls:.1f} ms each" if calls else "")
+                    )
+                    if options['metrics_file']:
+                        self.write_metrics(options['metrics_file'])
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            pool.close()
+
+    def write_metrics(self, path):
+        # Write then rename, so a collector never reads a half-written file
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, 'w') as f:
+            f.write(metrics.registry.render())
+        os.replace(partial, path)
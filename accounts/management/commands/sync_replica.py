@@ -0,0 +1,63 @@
+import logging
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts.routers import PRIMARY
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into each replica in DATABASE_REPLICAS "
+        "with the online backup API, once or every --interval seconds. A replica "
+        "that is busy or locked is skipped and retried on the next sync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Sync once and exit")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds between syncs")
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY].settings_dict
+        aliases = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not aliases:
+            raise CommandError("DATABASE_REPLICAS is empty; set DB_REPLICA_PATH to configure a replica")
+        for alias in [PRIMARY, *aliases]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"'{alias}' is not an SQLite database; use the server's own replication")
+
+        while True:
+            started = time.monotonic()
+            failed = []
+            for alias in aliases:
+                try:
+                    self.copy(primary['NAME'], connections[alias].settings_dict['NAME'])
+                except sqlite3.OperationalError as e:
+                    # The app keeps replica connections open, so a reader can hold a lock
+                    logger.warning("Could not sync replica %s: %s", alias, e)
+                    failed.append(alias)
+            self.stdout.write(
+                f"Synced {len(aliases) - len(failed)} of {len(aliases)} replica(s) "
+                f"in {time.monotonic() - started:.3f}s"
+            )
+            if options['once']:
+                if failed:
+                    raise CommandError(f"Could not sync {', '.join(failed)}")
+                break
+            time.sleep(options['interval'])
+
+    def copy(self, source_path, target_path):
+        source = sqlite3.connect(source_path, timeout=5)
+        target = sqlite3.connect(target_path, timeout=5)
+        try:
+            # One step copies a consistent snapshot; in WAL mode it doesn't block writers
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,187 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+# Upper bounds in seconds, as in the Prometheus client defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'http_request_duration_seconds': ('histogram', "Time spent in the view, by route and method"),
+    'http_requests_total': ('counter', "Requests served, by route, method and status"),
+    'db_queries_total': ('counter', "SQL queries run while serving requests, by route"),
+    'db_query_duration_seconds_total': ('counter', "Time spent in SQL while serving requests, by route"),
+    'phase_duration_seconds': ('histogram', "Time spent in email rendering, SMTP and password hashing"),
+}
+
+# Timings of the request being served, set by MetricsMiddleware. Shared
+# with the threads sync_to_async runs ORM calls in.
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.phases = defaultdict(float)  # phase -> seconds; 'sql' is filled by sql_wrapper
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    In-process counters and histograms, exported in the Prometheus text
+    format. Each worker process has its own registry, so scrape every
+    process (or sum them) when running several.
+    """
+
+    def __init__(self):
+        self._counters = defaultdict(float)  # (name, labels) -> value
+        self._histograms = defaultdict(Histogram)
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._counters[name, labels] += value
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            self._histograms[name, labels].observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def counter(self, name, labels):
+        with self._lock:
+            return self._counters.get((name, labels), 0)
+
+    def histogram(self, name, labels):
+        """(sum, count) of a histogram, (0.0, 0) if nothing was observed"""
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            return (histogram.sum, histogram.count) if histogram else (0.0, 0)
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count)) for key, h in self._histograms.items()
+            )
+
+        lines, described = [], set()
+
+        def describe(name):
+            if name not in described:
+                kind, text = HELP.get(name, ('untyped', name))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{format_labels(labels)} {value:g}")
+        for (name, labels), (counts, total, count) in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, counts):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total:g}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+registry = Registry()
+
+
+def begin_request():
+    return _current.set(RequestTimings())
+
+
+def end_request(token):
+    timings = _current.get()
+    _current.reset(token)
+    return timings
+
+
+def current():
+    """Timings of the request being served, or None"""
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    """Time a block as `phase`, for the phase histogram and Server-Timing"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe('phase_duration_seconds', (('phase', phase),), elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.phases[phase] += elapsed
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper hook that adds each query to the request's timings"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.phases['sql'] += time.perf_counter() - started
+        timings.queries += 1
+
+
+def record_request(timings, route, method, status):
+    """Fold a finished request into the registry; returns its duration"""
+    elapsed = time.perf_counter() - timings.started
+    registry.observe('http_request_duration_seconds', (('route', route), ('method', method)), elapsed)
+    registry.inc('http_requests_total', (('route', route), ('method', method), ('status', str(status))))
+    if timings.queries:
+        registry.inc('db_queries_total', (('route', route),), timings.queries)
+        registry.inc('db_query_duration_seconds_total', (('route', route),), timings.phases['sql'])
+    return elapsed
+
+
+def server_timing(timings, elapsed):
+    """Server-Timing header value: one entry per phase plus the total"""
+    entries = []
+    for phase, seconds in sorted(timings.phases.items()):
+        entry = f"{phase};dur={seconds * 1000:.1f}"
+        if phase == 'sql':
+            entry += f';desc="{timings.queries} queries"'
+        entries.append(entry)
+    entries.append(f"total;dur={elapsed * 1000:.1f}")
+    return ', '.join(entries)
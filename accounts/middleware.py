@@ -0,0 +1,222 @@
+import cProfile
+import logging
+import random
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import log, metrics, profiling, routers
+
+
+PIN_COOKIE = 'db_primary'
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+request_logger = logging.getLogger('accounts.requests')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Scope replica routing to the request. A request that writes sets a
+    short-lived cookie, so the client's next requests also read from the
+    primary until the replicas have caught up (REPLICA_PIN_SECONDS).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = routers.begin_request(pinned=PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        return self.process_response(response, wrote)
+
+    async def __acall__(self, request):
+        token = routers.begin_request(pinned=PIN_COOKIE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        return self.process_response(response, wrote)
+
+    def process_response(self, response, wrote):
+        if wrote and routers.replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class RequestLogMiddleware:
+    """
+    Tag everything logged during a request with its id (the client's
+    X-Request-ID, or a new one) and write one access log line per request
+    with its status and timings. Goes first so the id covers every layer.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        token = log.set_request_id(self.request_id(request))
+        try:
+            return self.process_response(request, self.get_response(request), started)
+        finally:
+            log.reset_request_id(token)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        token = log.set_request_id(self.request_id(request))
+        try:
+            return self.process_response(request, await self.get_response(request), started)
+        finally:
+            log.reset_request_id(token)
+
+    def request_id(self, request):
+        value = request.headers.get(REQUEST_ID_HEADER, '')
+        return value[:64] if value.isprintable() and value else uuid.uuid4().hex
+
+    def process_response(self, request, response, started):
+        response[REQUEST_ID_HEADER] = log.request_id()
+        match = getattr(request, 'resolver_match', None)
+        extra = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match is not None else None,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        timings = getattr(request, 'timings', None)
+        if timings is not None:
+            extra['sql_queries'] = timings.queries
+            extra.update({f"{phase}_ms": round(seconds * 1000, 1) for phase, seconds in timings.phases.items()})
+        request_logger.info(f"{request.method} {request.path} {response.status_code}", extra=extra)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record per-route latency, status and SQL counts in accounts.metrics and
+    add a Server-Timing header (sql, render, hash, total) to each response.
+    Streaming responses are timed until their headers are returned.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = metrics.begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = metrics.end_request(token)
+        return self.process_response(request, response, timings)
+
+    async def __acall__(self, request):
+        token = metrics.begin_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = metrics.end_request(token)
+        return self.process_response(request, response, timings)
+
+    def process_response(self, request, response, timings):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        elapsed = metrics.record_request(timings, route, request.method, response.status_code)
+        response['Server-Timing'] = metrics.server_timing(timings, elapsed)
+        request.timings = timings  # for RequestLogMiddleware
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in (PROFILE_REQUESTS) profiler for sync views. PROFILE_SAMPLE_RATE
+    of requests run under cProfile; every other request is watched by the
+    stack sampler and written out only if it takes PROFILE_SLOW_REQUEST_MS
+    or longer. Profiles go to a bounded ring of .prof files in PROFILE_DIR
+    (see `python manage.py profiles`). Async views are passed through: the
+    event loop runs other requests between their awaits.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILE_REQUESTS', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.01)
+        slow_ms = getattr(settings, 'PROFILE_SLOW_REQUEST_MS', 1000)
+        self.slow_seconds = slow_ms / 1000 if slow_ms is not None else None
+        self.sampler = profiling.StackSampler(interval=getattr(settings, 'PROFILE_STACK_INTERVAL_MS', 5) / 1000)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.time()
+        if random.random() < self.sample_rate:
+            return self.run_cprofile(request, started)
+        if self.slow_seconds is None:
+            return self.get_response(request)
+
+        self.sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = self.sampler.stop()
+        duration = time.time() - started
+        if duration >= self.slow_seconds and stacks:
+            profiling.save(
+                lambda path: profiling.write_stack_profile(path, stacks, self.sampler.interval),
+                profiling.profile_filename(started, self.route(request), duration), 'stack',
+            )
+        return response
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def run_cprofile(self, request, started):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this interpreter
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.time() - started
+        profiling.save(profiler.dump_stats, profiling.profile_filename(started, self.route(request), duration),
+                       'cprofile')
+        return response
+
+    def route(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match.route if match is not None else 'unmatched'
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_contact_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['service', 'date', 'time'], name='booking_service_slot_idx'),
+        ),
+    ]
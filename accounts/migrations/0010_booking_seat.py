@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+def number_seats(apps, schema_editor):
+    # Existing bookings that share a slot get seats 0, 1, 2... in booking order
+    Booking = apps.get_model('accounts', 'Booking')
+    last_slot, seat = None, 0
+    for booking in Booking.objects.order_by('service_id', 'date', 'time', 'id').iterator():
+        slot = (booking.service_id, booking.date, booking.time)
+        seat = seat + 1 if slot == last_slot else 0
+        last_slot = slot
+        if seat:
+            Booking.objects.filter(pk=booking.pk).update(seat=seat)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_booking_service_slot_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='seat',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(number_seats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(fields=('service', 'date', 'time', 'seat'), name='booking_slot_seat_unique'),
+        ),
+    ]
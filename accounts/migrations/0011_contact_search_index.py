@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from accounts.search_ddl import CREATE_TABLE, FTS_TABLE, TRIGGERS, SQLiteRunSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_booking_seat'),
+    ]
+
+    operations = [
+        SQLiteRunSQL(
+            sql=[
+                CREATE_TABLE,
+                *TRIGGERS.values(),
+                f"INSERT INTO {FTS_TABLE}(rowid, name, email, message) "
+                "SELECT id, name, email, message FROM accounts_contact",
+            ],
+            reverse_sql=[
+                *(f"DROP TRIGGER IF EXISTS {name}" for name in TRIGGERS),
+                f"DROP TABLE IF EXISTS {FTS_TABLE}",
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from accounts.search_ddl import TRIGGERS, SQLiteRunSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_contact_search_index'),
+    ]
+
+    operations = [
+        # Reversing RemoveField rebuilds accounts_contact, and SQLite drops the
+        # search triggers with the old table. Operations are reversed in order,
+        # so this runs last and puts back the triggers from 0011.
+        SQLiteRunSQL(
+            sql=migrations.RunSQL.noop,
+            reverse_sql=list(TRIGGERS.values()),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='assigned_to',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_contacts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(condition=models.Q(('is_responded', False)), fields=['created_at', 'id'], name='contact_unresponded_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_contact_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedContactBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partition', models.CharField(max_length=7)),
+                ('path', models.CharField(max_length=255)),
+                ('min_id', models.BigIntegerField()),
+                ('max_id', models.BigIntegerField()),
+                ('count', models.PositiveIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Contact Batch',
+                'verbose_name_plural': 'Archived Contact Batches',
+                'ordering': ['min_id'],
+                'indexes': [models.Index(fields=['min_id', 'max_id'], name='archive_batch_id_range_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from .managers import UserManager
 
@@ -48,10 +49,19 @@ class Booking(models.Model):
     email =     models.EmailField(blank=True, null=True)
     time =      models.CharField(max_length=50, choices=HOURS, default="09:00")
     date =      models.DateField()
+    seat =      models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('user', 'date', 'time', 'service')
+        constraints = [
+            # A slot takes BOOKING_SLOT_CAPACITY bookings: one per seat number
+            models.UniqueConstraint(fields=['service', 'date', 'time', 'seat'], name='booking_slot_seat_unique'),
+        ]
+        indexes = [
+            # Slot availability aggregates bookings per service over a date range
+            models.Index(fields=['service', 'date', 'time'], name='booking_service_slot_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -64,11 +74,101 @@ class Contact(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_responded = models.BooleanField(default=False)
+    assigned_to = models.ForeignKey(User, related_name='assigned_contacts', blank=True, null=True,
+                                    on_delete=models.SET_NULL)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the inbox walks (created_at, id) newest first
+            models.Index(fields=['-created_at', '-id'], name='contact_created_id_idx'),
+            # The unresponded queue only; its size doesn't grow with answered messages
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_responded=False),
+                         name='contact_unresponded_idx'),
+        ]
         verbose_name = 'Contact Submission'
         verbose_name_plural = 'Contact Submissions'
     
     def __str__(self):
-        return f"{self.name}"
\ No newline at end of file
+        return f"{self.name}"
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be delivered by the `send_outbox` worker.
+    Rows are written in the same transaction as the record they describe.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Dead'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Outbox Emails'
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)}"
+
+
+class RefreshToken(models.Model):
+    """
+    Server-side record of an issued refresh token, looked up only by the
+    refresh and logout endpoints. Each refresh deletes the presented token's
+    row and issues a new one; revoked_at marks the rest of a user's tokens
+    when a copied token is detected. `prune_refresh_tokens` clears expired
+    and revoked rows.
+    """
+    user = models.ForeignKey(User, related_name='refresh_tokens', on_delete=models.CASCADE)
+    jti = models.CharField(max_length=32, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.user} ({self.jti})"
+
+
+class ArchivedContactBatch(models.Model):
+    """
+    One gzipped NDJSON file of contact submissions moved out of the live
+    table by `archive_contacts`. Files are grouped by the month the
+    submissions were made in; the id range finds the file for a lookup.
+    """
+    partition = models.CharField(max_length=7)  # YYYY-MM of created_at
+    path = models.CharField(max_length=255)  # relative to ARCHIVE_DIR
+    min_id = models.BigIntegerField()
+    max_id = models.BigIntegerField()
+    count = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['min_id']
+        indexes = [
+            models.Index(fields=['min_id', 'max_id'], name='archive_batch_id_range_idx'),
+        ]
+        verbose_name = 'Archived Contact Batch'
+        verbose_name_plural = 'Archived Contact Batches'
+
+    def __str__(self):
+        return f"{self.partition} #{self.min_id}-{self.max_id} ({self.count})"
@@ -0,0 +1,81 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+
+
+class KeysetPagination:
+    """
+    Cursor pagination on a composite key, e.g. ('-created_at', '-id').
+    The cursor holds the key of the last row on the page and the next page
+    is a `WHERE key < cursor ORDER BY key LIMIT n` query, so any page costs
+    the same as the first one when the key is indexed. The last ordering
+    field must be unique and all fields must sort in the same direction.
+    """
+    ordering = ('-id',)
+    page_size = 25
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def __init__(self, ordering=None, page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+        self.descending = self.ordering[0].startswith('-')
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.next_cursor = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, obj):
+        # isoformat() keeps microseconds, which DjangoJSONEncoder would truncate
+        values = [getattr(obj, field) for field in self.fields]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.fields):
+                raise ValueError
+            values = [model._meta.get_field(field).to_python(value) for field, value in zip(self.fields, values)]
+            # Key fields are never null, and a None would end up as `field__lt=None`
+            if any(value is None for value in values):
+                raise ValueError
+            return values
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound('Invalid cursor')
+
+    def after(self, values):
+        """(f1, f2, ...) > (v1, v2, ...) written out as ORs of equality prefixes"""
+        lookup = 'lt' if self.descending else 'gt'
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            term = Q(**{f"{field}__{lookup}": values[i]})
+            for prev_field, prev_value in zip(self.fields[:i], values[:i]):
+                term &= Q(**{prev_field: prev_value})
+            condition |= term
+        return condition
+
+    def paginate_queryset(self, queryset, request):
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor, queryset.model)))
+
+        # Fetch one extra row to know whether there is a next page
+        rows = list(queryset[:page_size + 1])
+        page, has_next = rows[:page_size], len(rows) > page_size
+        self.next_cursor = self.encode_cursor(page[-1]) if has_next else None
+        return page
@@ -0,0 +1,155 @@
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+
+# <started>-<route>-<duration>ms-<kind>.prof, e.g. 20261018T171332123456-api_bookings-2350ms-stack.prof
+FILENAME_RE = re.compile(r'^(?P<started>\d{8}T\d{12})-(?P<route>.+)-(?P<ms>\d+)ms-(?P<kind>cprofile|stack)\.prof$')
+
+Profile = namedtuple('Profile', 'path started route ms kind')
+
+
+def profile_dir():
+    return str(getattr(settings, 'PROFILE_DIR', 'profiles'))
+
+
+def route_slug(route):
+    return re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+
+
+def profile_filename(started, route, duration):
+    stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(started)) + f"{int(started * 1e6) % 1000000:06d}"
+    return f"{stamp}-{route_slug(route)}-{int(duration * 1000)}ms"
+
+
+def list_profiles(directory=None):
+    """Captured profiles, oldest first"""
+    directory = directory or profile_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in sorted(names):
+        match = FILENAME_RE.match(name)
+        if match:
+            profiles.append(Profile(os.path.join(directory, name), match['started'], match['route'],
+                                    int(match['ms']), match['kind']))
+    return profiles
+
+
+def save(write, name, kind):
+    """
+    Write a profile with `write(path)` and drop the oldest files beyond
+    PROFILE_MAX_FILES, so the directory is a bounded ring.
+    """
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}-{kind}.prof")
+    write(path)
+    profiles = list_profiles(directory)
+    for profile in profiles[:max(len(profiles) - getattr(settings, 'PROFILE_MAX_FILES', 100), 0)]:
+        try:
+            os.remove(profile.path)
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def frame_key(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def samples_to_stats(stacks, interval):
+    """
+    Turn stack samples (root first) into the dict pstats loads, so stack
+    profiles can be read with the same tools as cProfile output. Call
+    counts are sample counts and times are samples * interval.
+    """
+    stats = {}
+    for stack in stacks:
+        seen = set()
+        for depth, key in enumerate(stack):
+            entry = stats.setdefault(key, [0, 0, 0.0, 0.0, {}])
+            leaf = depth == len(stack) - 1
+            if key not in seen:
+                seen.add(key)
+                entry[0] += 1
+                entry[1] += 1
+                entry[3] += interval
+            if leaf:
+                entry[2] += interval
+            if depth:
+                caller = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                caller[0] += 1
+                caller[1] += 1
+                caller[2] += interval if leaf else 0.0
+                caller[3] += interval
+    return {
+        key: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+        for key, (cc, nc, tt, ct, callers) in stats.items()
+    }
+
+
+def write_stack_profile(path, stacks, interval):
+    with open(path, 'wb') as f:
+        marshal.dump(samples_to_stats(stacks, interval), f)
+
+
+class StackSampler:
+    """
+    One background thread that snapshots the stacks of the threads that
+    registered with it every `interval` seconds. Cheap enough to watch
+    every request, so a slow one can be written out after the fact.
+    """
+
+    def __init__(self, interval=0.005, max_samples=20000):
+        self.interval = interval
+        self.max_samples = max_samples
+        self._threads = {}  # thread id -> list of stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_running(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                watched = list(self._threads.items())
+                if not watched:
+                    # Idle; the next start() launches a new thread
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for thread_id, samples in watched:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own or len(samples) >= self.max_samples:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_key(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                samples.append(tuple(stack))
+
+    def start(self):
+        """Start sampling the calling thread"""
+        with self._lock:
+            self._threads[threading.get_ident()] = []
+            self._ensure_running()
+
+    def stop(self):
+        """Stop sampling the calling thread and return its samples"""
+        with self._lock:
+            return self._threads.pop(threading.get_ident(), [])
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.html import strip_tags
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+EMAIL_TEMPLATES = (
+    'emails/contact_notification.html',
+    'emails/client_confirmation.html',
+    'emails/booking_confirmation.html',
+    'emails/admin_booking_notification.html',
+    'emails/bulk_booking_confirmation.html',
+    'emails/admin_bulk_booking_notification.html',
+)
+
+
+def text_template_name(template_name):
+    """emails/foo.html -> emails/foo.txt"""
+    base, _, _ = template_name.rpartition('.')
+    return f"{base}.txt"
+
+
+class EmailRenderer:
+    """
+    Compiles each email template once and keeps the compiled HTML template
+    together with its dedicated plain-text template (emails/<name>.txt).
+    Templates without a text variant fall back to strip_tags.
+    """
+
+    def __init__(self):
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def load(self, template_names=EMAIL_TEMPLATES):
+        """
+        Compile the given templates up front (called from AppConfig.ready).
+        A template that can't be loaded is only logged here; it raises when
+        an email actually needs it, so a bad path never stops the app starting.
+        """
+        for template_name in template_names:
+            try:
+                self.get(template_name)
+            except Exception as e:
+                logger.warning(f"Could not precompile email template {template_name}: {e!r}")
+
+    def _compile(self, template_name):
+        html_template = get_template(template_name)
+        try:
+            text_template = get_template(text_template_name(template_name))
+        except TemplateDoesNotExist:
+            text_template = None
+        return html_template, text_template
+
+    def get(self, template_name):
+        compiled = self._compiled.get(template_name)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(template_name)
+                if compiled is None:
+                    compiled = self._compiled[template_name] = self._compile(template_name)
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+
+    def render(self, template_name, context):
+        """Return a (plain_text, html) pair for an email template"""
+        html_template, text_template = self.get(template_name)
+        with metrics.timed('render'):
+            html_message = html_template.render(context)
+            if text_template is not None:
+                plain_message = text_template.render(context).strip()
+            else:
+                plain_message = strip_tags(html_message)
+        return plain_message, html_message
+
+
+renderer = EmailRenderer()
+
+
+def benchmark(contexts, iterations=1000):
+    """
+    Time the cached renderer against render_to_string + strip_tags.
+    `contexts` maps template name to the context to render it with.
+    Returns {template_name: {'baseline_us': ..., 'cached_us': ...}} per render.
+    """
+    from django.template.loader import render_to_string
+
+    results = {}
+    for template_name, context in contexts.items():
+        renderer.get(template_name)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            strip_tags(render_to_string(template_name, context))
+        baseline = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            renderer.render(template_name, context)
+        cached = time.perf_counter() - start
+
+        results[template_name] = {
+            'baseline_us': round(baseline / iterations * 1e6, 1),
+            'cached_us': round(cached / iterations * 1e6, 1),
+        }
+    return results
@@ -0,0 +1,41 @@
+from django.db import IntegrityError, transaction
+
+from .availability import slot_capacity
+from .models import Booking
+
+
+class SlotUnavailable(Exception):
+    """The booking could not be reserved; maps to 409 Conflict"""
+
+
+class AlreadyBooked(SlotUnavailable):
+    def __init__(self):
+        super().__init__("You have already booked this service at the selected date and time.")
+
+
+class SlotFull(SlotUnavailable):
+    def __init__(self):
+        super().__init__("This time slot is fully booked. Please choose another time.")
+
+
+def reserve(booking):
+    """
+    Insert a booking, letting the database constraints decide whether the
+    slot is still free. Seats are tried in order, so with free capacity this
+    is a single INSERT; concurrent requests for the last seat can't both win
+    because (service, date, time, seat) is unique.
+    """
+    for seat in range(slot_capacity()):
+        booking.seat = seat
+        try:
+            with transaction.atomic():
+                booking.save(force_insert=True)
+            return booking
+        except IntegrityError:
+            booking.pk = None
+            # Only the failure path pays for working out which constraint fired
+            if Booking.objects.filter(
+                user=booking.user, service=booking.service, date=booking.date, time=booking.time
+            ).exists():
+                raise AlreadyBooked()
+    raise SlotFull()
@@ -0,0 +1,67 @@
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import connections
+
+
+PRIMARY = 'default'
+
+# Per-request routing state, set by ReplicaPinningMiddleware. Outside a
+# request (management commands, the outbox worker) it is None and every
+# query goes to the primary.
+_request_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def begin_request(pinned=False):
+    """Start routing a request; returns a token for end_request()"""
+    return _request_state.set(RoutingState(pinned))
+
+
+def end_request(token):
+    """Stop routing the request; returns True if it wrote to the primary"""
+    state = _request_state.get()
+    _request_state.reset(token)
+    return state is not None and state.wrote
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary; reads made during a request go to a random
+    replica from DATABASE_REPLICAS. After a request writes, its remaining
+    reads stay on the primary so it sees its own writes, as do reads inside
+    a transaction on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state.pinned:
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        aliases = replicas()
+        return random.choice(aliases) if aliases else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *replicas()}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema along with the data from the primary
+        return db not in replicas()
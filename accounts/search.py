@@ -0,0 +1,141 @@
+import re
+
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Contact
+from .search_ddl import FTS_TABLE, TRIGGERS
+
+
+# SQLite FTS5 index over Contact.name/email/message. It stores its own copy
+# of the text (rowid = contact id) and is kept current by triggers, so bulk
+# updates and deletes are indexed too, not just save()/delete(). The table
+# and triggers are created by migration 0011 from accounts.search_ddl.
+
+# snippet() wraps matches in these control characters rather than HTML: the
+# message is untrusted text, so it is escaped first and only then marked up
+MARK_START, MARK_END = '\x02', '\x03'
+
+# bm25() weights for name, email, message: a hit in the name ranks highest
+WEIGHTS = (5.0, 3.0, 1.0)
+
+SEARCH_SQL = f"""
+    SELECT c.id, c.name, c.email, c.phone, c.message, c.created_at, c.is_responded,
+           bm25({FTS_TABLE}, {', '.join(map(str, WEIGHTS))}) AS rank,
+           snippet({FTS_TABLE}, 2, char(2), char(3), '…', 16) AS snippet
+    FROM {FTS_TABLE}
+    JOIN accounts_contact c ON c.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH %s
+    ORDER BY rank
+    LIMIT %s
+"""
+
+
+def highlight(snippet):
+    """HTML-escape a snippet, then turn the match markers into <mark> tags"""
+    return escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def fts_available(using=None):
+    return connections[using or router.db_for_read(Contact)].vendor == 'sqlite'
+
+
+def match_expression(query):
+    """
+    Turn user input into a safe FTS5 query: every word must match, the
+    last one as a prefix so results show up while typing. Operators and
+    quotes in the input are treated as plain text.
+    """
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+
+def search_contacts(query, limit=20):
+    """
+    Contacts matching `query`, best first, each with `rank` (bm25, lower
+    is better) and a highlighted, HTML-escaped `snippet` of the message.
+    Falls back to unranked icontains on databases without FTS5.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    if fts_available():
+        contacts = list(Contact.objects.raw(SEARCH_SQL, [expression, limit]))
+        for contact in contacts:
+            contact.snippet = highlight(contact.snippet)
+        return contacts
+
+    condition = Q()
+    for term in re.findall(r'\w+', query):
+        condition &= Q(name__icontains=term) | Q(email__icontains=term) | Q(message__icontains=term)
+    contacts = list(Contact.objects.filter(condition).order_by('-created_at', '-id')[:limit])
+    for contact in contacts:
+        contact.rank, contact.snippet = None, escape(contact.message[:200])
+    return contacts
+
+
+def index_exists(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def missing_triggers(connection):
+    """
+    Names of the index triggers that are gone. SQLite drops a table's
+    triggers when a migration rebuilds it, which leaves the index silently
+    going stale.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'accounts_contact'")
+        present = {name for name, in cursor.fetchall()}
+    return [name for name in TRIGGERS if name not in present]
+
+
+def restore_triggers(connection):
+    """Recreate the missing index triggers; returns their names"""
+    missing = missing_triggers(connection)
+    with connection.cursor() as cursor:
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+    return missing
+
+
+def rebuild_index(batch_size=5000, using='default', progress=None):
+    """
+    Re-index every contact in id batches, each in its own short transaction,
+    so writers are never locked out for long. A batch replaces exactly its
+    id range, so it is safe to run while the triggers keep indexing new
+    writes; missing triggers are recreated first. Returns the number of
+    rows indexed.
+    """
+    connection = connections[using]
+    restore_triggers(connection)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT MAX(id) FROM accounts_contact")
+        max_id = cursor.fetchone()[0] or 0
+
+    indexed, start = 0, 0
+    while start <= max_id:
+        end = start + batch_size
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid >= %s AND rowid < %s", [start, end])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, name, email, message) "
+                "SELECT id, name, email, message FROM accounts_contact WHERE id >= %s AND id < %s",
+                [start, end],
+            )
+            indexed += cursor.rowcount
+        if progress:
+            progress(indexed)
+        start = end
+
+    with connection.cursor() as cursor:
+        # Drop index rows beyond the last contact, then merge the index segments
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid > %s AND rowid NOT IN (SELECT id FROM accounts_contact)",
+                       [max_id])
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+# DDL of the SQLite FTS5 index over contact submissions. Migrations 0011 and
+# 0012 and accounts.search all use these, so there is a single copy. Editing
+# them does not touch existing databases; a change needs its own migration.
+FTS_TABLE = 'accounts_contact_fts'
+
+CREATE_TABLE = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "name, email, message, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+# IF NOT EXISTS, so accounts.search and the reverse of migration 0012 can
+# re-run them after SQLite rebuilds accounts_contact (and drops triggers)
+TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON accounts_contact BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END""",
+    f'{FTS_TABLE}_ad': f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON accounts_contact BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f'{FTS_TABLE}_au': f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF name, email, message ON accounts_contact BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END""",
+}
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    """RunSQL that only runs on SQLite; elsewhere search falls back to icontains"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
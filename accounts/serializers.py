@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import *
+from . import metrics
+from .reservations import reserve
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,7 +14,8 @@ class UserSerializer(serializers.ModelSerializer):
         password = validated_data.pop('password', None)
         instance = self.Meta.model(**validated_data)
         if password is not None:
-            instance.set_password(password)
+            with metrics.timed('hash'):
+                instance.set_password(password)
         instance.save()
         return instance
     
@@ -53,19 +56,26 @@ class BookingSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'user']
 
-    def validate(self, attrs):
-        request = self.context.get('request')
-        user = request.user if request else None
-        service = attrs.get('service')
-        date = attrs.get('date')
-        time = attrs.get('time')
-
-        if user and Booking.objects.filter(user=user, service=service, date=date, time=time).exists():
-            raise serializers.ValidationError(
-                "You have already booked this service at the selected date and time."
-            )
-        return attrs
-    
+    def create(self, validated_data):
+        """
+        Reserve through the database constraints instead of checking for a
+        clash first. Raises reservations.SlotUnavailable when the slot is taken.
+        """
+        return reserve(Booking(**validated_data))
+
+
+class BulkBookingItemSerializer(serializers.ModelSerializer):
+    """
+    One entry of a bulk booking request. Services and conflicts are resolved
+    for the whole batch at once by the view, so nothing here hits the DB.
+    """
+    service_id = serializers.IntegerField()
+
+    class Meta:
+        model = Booking
+        fields = ['service_id', 'name', 'email', 'time', 'date']
+
+
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
@@ -85,3 +95,36 @@ class ContactSerializer(serializers.ModelSerializer):
         if len(value.strip()) < 5:
             raise serializers.ValidationError("Please provide more details about your legal matter.")
         return value.strip()
+
+
+class InboxContactSerializer(ContactSerializer):
+    """A contact in the staff inbox, with the id of the staff member it is assigned to"""
+    class Meta(ContactSerializer.Meta):
+        fields = ContactSerializer.Meta.fields + ['assigned_to']
+        read_only_fields = ContactSerializer.Meta.read_only_fields + ['assigned_to']
+
+
+class InboxActionSerializer(serializers.Serializer):
+    """POST body for /api/contact/inbox/actions/"""
+    MARK_RESPONDED = 'mark_responded'
+    ASSIGN = 'assign'
+
+    action = serializers.ChoiceField(choices=[MARK_RESPONDED, ASSIGN])
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+    assignee = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.filter(is_staff=True), required=False, allow_null=True
+    )
+
+    def validate(self, data):
+        if data['action'] == self.ASSIGN and 'assignee' not in data:
+            raise serializers.ValidationError({'assignee': ['Required for the assign action (null to unassign).']})
+        return data
+
+
+class ContactSearchResultSerializer(ContactSerializer):
+    """A contact from search_contacts(), with its bm25 rank and a highlighted snippet"""
+    rank = serializers.FloatField(read_only=True, allow_null=True)
+    snippet = serializers.CharField(read_only=True)
+
+    class Meta(ContactSerializer.Meta):
+        fields = ContactSerializer.Meta.fields + ['rank', 'snippet']
@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import availability, catalog, metrics, sqlite
+from .auth import principal_cache
+from .models import Booking, Services, User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_principal(sender, instance, **kwargs):
+    """Drop cached logins for a user as soon as the user changes or is deleted"""
+    principal_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Booking)
+def update_availability_on_save(sender, instance, created, **kwargs):
+    """Keep the cached slot bitmaps in step with booking writes"""
+    if created:
+        transaction.on_commit(lambda: availability.refresh_day(instance.service_id, instance.date))
+    else:
+        # The booking may have moved from another day or service we can't see here
+        transaction.on_commit(availability.invalidate_all)
+
+
+@receiver(post_delete, sender=Booking)
+def update_availability_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: availability.refresh_day(instance.service_id, instance.date))
+
+
+@receiver(post_save, sender=Services)
+@receiver(post_delete, sender=Services)
+def invalidate_catalog(sender, instance, **kwargs):
+    """Bump the catalog version so the next request rebuilds it"""
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """WAL, busy timeout and cache settings for every new SQLite connection"""
+    if connection.vendor == 'sqlite':
+        sqlite.apply_pragmas(connection.connection)
+
+
+@receiver(connection_created)
+def instrument_queries(sender, connection, **kwargs):
+    """Count and time the queries each request runs (see accounts.metrics)"""
+    if metrics.sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.sql_wrapper)
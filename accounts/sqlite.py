@@ -0,0 +1,17 @@
+from django.conf import settings
+
+
+def pragma_statements(pragmas=None):
+    """PRAGMA statements for the configured SQLite tuning profile"""
+    if pragmas is None:
+        pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    return [f"PRAGMA {name} = {value}" for name, value in pragmas.items()]
+
+
+def apply_pragmas(connection):
+    """
+    Apply the profile to a new DB-API connection. Runs on the raw sqlite3
+    connection so the statements don't show up in query logs and counts.
+    """
+    for statement in pragma_statements():
+        connection.execute(statement)
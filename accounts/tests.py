@@ -1,3 +1,1176 @@
-from django.test import TestCase
+import base64
+import datetime
+import gzip
+import io
+import json
+import logging
+import os
+import pstats
+import sqlite3
+import tempfile
+import time
+from smtplib import SMTPServerDisconnected
+from unittest import mock
 
-# Create your tests here.
+import jwt
+
+from django.core import mail
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.template import TemplateDoesNotExist
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .auth import PrincipalCache, issue_access_token, issue_refresh_token, principal_cache
+from . import availability, catalog, metrics, profiling, routers
+from .archive import archive_contacts, retention_cutoff
+from .emails import ConnectionPool, deliver_pending
+from .log import BackgroundFileHandler
+from .rendering import EmailRenderer
+from .management.commands import sync_replica
+from .management.commands.bench_http import find_regressions, sql_queries
+from .checks import check_search_triggers
+from .search import FTS_TABLE, missing_triggers, rebuild_index
+from .throttling import take_token
+from .middleware import PIN_COOKIE
+from .models import *
+
+
+class TemporaryDirectorySettingMixin:
+    """Points the `directory_setting` setting at a fresh temporary directory for each test"""
+    directory_setting = None
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = self.settings(**{self.directory_setting: directory.name})
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()  # rate limit buckets and the contact dedup window
+        self.client = APIClient()
+        self.contact_data = {
+            'name': 'Jane Client',
+            'email': 'jane@example.com',
+            'message': 'I need help with a contract.',
+        }
+
+    def test_contact_queues_emails_without_sending(self):
+        response = self.client.post('/api/contact/', self.contact_data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.PENDING).count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_plain_text_comes_from_text_template(self):
+        self.client.post('/api/contact/', self.contact_data, format='json')
+        email = OutboxEmail.objects.get(recipients=['jane@example.com'])
+        self.assertTrue(email.body.startswith('KGM Legal Practitioners'))
+        self.assertIn('Dear Jane Client,', email.body)
+        self.assertNotIn('<', email.body)
+        self.assertIn('<h1', email.html_body)
+
+    def test_missing_template_is_logged_at_load_not_raised(self):
+        renderer = EmailRenderer()
+        with self.assertLogs('accounts.rendering', 'WARNING'):
+            renderer.load(['emails/missing.html'])
+        with self.assertRaises(TemplateDoesNotExist):
+            renderer.render('emails/missing.html', {})
+
+    def test_worker_delivers_pending_emails(self):
+        self.client.post('/api/contact/', self.contact_data, format='json')
+        self.assertEqual(deliver_pending(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('jane@example.com', mail.outbox[1].to)
+        self.assertEqual(mail.outbox[1].alternatives[0][1], 'text/html')
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists())
+
+    def test_worker_reports_smtp_time(self):
+        self.client.post('/api/contact/', self.contact_data, format='json')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'outbox.prom')
+        output = io.StringIO()
+        call_command('send_outbox', once=True, metrics_file=path, stdout=output)
+        self.assertIn('SMTP', output.getvalue())
+        with open(path) as f:
+            self.assertIn('phase_duration_seconds_count{phase="smtp"}', f.read())
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_dead_letter(self):
+        email = OutboxEmail.objects.create(
+            subject='Hi', body='Hi', from_email='a@example.com', recipients=['b@example.com']
+        )
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=OSError('relay down'),
+        ):
+            self.assertEqual(deliver_pending(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.PENDING)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+            OutboxEmail.objects.update(next_attempt_at=timezone.now() - datetime.timedelta(seconds=1))
+            self.assertEqual(deliver_pending(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.DEAD)
+        self.assertEqual(email.last_error, 'relay down')
+
+    def test_pool_reuses_connection_across_batches(self):
+        pool = ConnectionPool(size=1)
+        self.client.post('/api/contact/', self.contact_data, format='json')
+        deliver_pending(connection_pool=pool)
+        self.client.post('/api/contact/', dict(self.contact_data, message='A follow-up question.'), format='json')
+        deliver_pending(connection_pool=pool)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(pool.stats()['connections_opened'], 1)
+        self.assertEqual(pool.stats()['messages_sent'], 4)
+
+    def test_pool_reconnects_after_server_drops_session(self):
+        pool = ConnectionPool(size=1)
+        self.client.post('/api/contact/', self.contact_data, format='json')
+        deliver_pending(connection_pool=pool)
+
+        original = mail.backends.locmem.EmailBackend.send_messages
+        calls = []
+
+        def drop_once(backend, messages):
+            if not calls:
+                calls.append(backend)
+                raise SMTPServerDisconnected('idle timeout')
+            return original(backend, messages)
+
+        self.client.post('/api/contact/', dict(self.contact_data, message='A follow-up question.'), format='json')
+        with mock.patch.object(mail.backends.locmem.EmailBackend, 'send_messages', drop_once):
+            self.assertEqual(deliver_pending(connection_pool=pool), (2, 0))
+        self.assertEqual(pool.stats()['connections_opened'], 2)
+
+
+    def test_pool_closes_the_reconnection_when_the_retry_fails(self):
+        pool = ConnectionPool(size=1)
+        self.client.post('/api/contact/', self.contact_data, format='json')
+        with mock.patch.object(mail.backends.locmem.EmailBackend, 'send_messages',
+                               side_effect=SMTPServerDisconnected('gone')), \
+                mock.patch.object(mail.backends.locmem.EmailBackend, 'close') as close:
+            self.assertEqual(deliver_pending(connection_pool=pool), (0, 2))
+        # Two messages, each on a connection that dropped and a reconnection that failed too
+        self.assertEqual(pool.stats()['connections_opened'], 4)
+        self.assertEqual(close.call_count, 4)
+
+    def test_nothing_sent_counts_as_a_failure(self):
+        self.client.post('/api/contact/', self.contact_data, format='json')
+        with mock.patch.object(mail.backends.locmem.EmailBackend, 'send_messages', return_value=0):
+            self.assertEqual(deliver_pending(connection_pool=ConnectionPool(size=1)), (0, 2))
+        self.assertFalse(OutboxEmail.objects.filter(status=OutboxEmail.SENT).exists())
+
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        principal_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', password='s3cret-pass')
+        self.client.post('/api/login/', {'email': 'client@example.com', 'password': 's3cret-pass'}, format='json')
+
+    def test_repeat_requests_skip_the_database(self):
+        self.assertEqual(self.client.get('/api/user/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/user/')
+        self.assertEqual(response.data['email'], 'client@example.com')
+        self.assertEqual(principal_cache.stats()['hits'], 1)
+        self.assertEqual(principal_cache.stats()['misses'], 1)
+
+    def test_deactivation_takes_effect_immediately(self):
+        self.client.get('/api/user/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/user/').status_code, 403)
+
+    def test_deactivation_in_another_worker_takes_effect(self):
+        self.client.get('/api/user/')
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        # That worker's own cache instance; only the shared marker reaches this one
+        PrincipalCache().invalidate_user(self.user.pk)
+        self.assertEqual(self.client.get('/api/user/').status_code, 403)
+
+    def test_evicted_marker_reads_as_revoked(self):
+        self.client.get('/api/user/')
+        cache.delete(PrincipalCache._marker_key(self.user.pk))
+        self.client.get('/api/user/')
+        self.assertEqual(principal_cache.stats()['misses'], 2)
+        self.assertEqual(principal_cache.stats()['hits'], 0)
+
+    def test_token_without_exp_is_rejected(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + jwt.encode({'id': self.user.id, 'type': 'access'},
+                                                                       'secret', algorithm='HS256'))
+        self.assertEqual(client.get('/api/user/').status_code, 403)
+
+
+class RefreshTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', password='s3cret-pass')
+        response = self.client.post(
+            '/api/login/', {'email': 'client@example.com', 'password': 's3cret-pass'}, format='json'
+        )
+        self.refresh = response.cookies['refresh'].value
+
+    def test_refresh_rotates_without_password_check(self):
+        with mock.patch.object(User, 'check_password') as check_password:
+            response = self.client.post('/api/token/refresh/')
+        self.assertEqual(response.status_code, 200)
+        check_password.assert_not_called()
+        self.assertNotEqual(response.cookies['refresh'].value, self.refresh)
+        self.assertEqual(self.client.get('/api/user/').status_code, 200)
+
+    def test_reusing_a_rotated_token_revokes_the_family(self):
+        self.client.post('/api/token/refresh/')
+        response = APIClient().post('/api/token/refresh/', {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(RefreshToken.objects.filter(user=self.user, revoked_at__isnull=True).exists())
+
+    def test_refresh_token_is_not_an_access_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh}')
+        self.assertEqual(client.get('/api/user/').status_code, 403)
+
+    def test_logout_revokes_refresh_token(self):
+        self.client.post('/api/logout/')
+        self.assertFalse(RefreshToken.objects.filter(revoked_at__isnull=True).exists())
+
+    def test_list_body_is_rejected(self):
+        response = APIClient().post('/api/token/refresh/', [self.refresh], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_used_tokens_do_not_accumulate(self):
+        for _ in range(3):
+            self.assertEqual(self.client.post('/api/token/refresh/').status_code, 200)
+        self.assertEqual(RefreshToken.objects.count(), 1)
+        # Reuse revokes the live token; pruning then clears it along with expired rows
+        APIClient().post('/api/token/refresh/', {'refresh': self.refresh}, format='json')
+        RefreshToken.objects.create(user=self.user, jti='expired', expires_at=timezone.now())
+        call_command('prune_refresh_tokens', stdout=io.StringIO())
+        self.assertFalse(RefreshToken.objects.exists())
+
+
+class ContactInboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        now = timezone.now()
+        for i in range(7):
+            Contact.objects.create(name=f'Client {i}', email=f'c{i}@example.com', message='Please call me',
+                                   is_responded=i % 2 == 0)
+        # Two rows share a timestamp so the id tiebreaker is exercised
+        Contact.objects.update(created_at=now)
+        Contact.objects.filter(name__in=['Client 0', 'Client 1']).update(created_at=now - datetime.timedelta(days=3))
+
+    def test_cursor_walks_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 3}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get('/api/contact/', params)
+            seen += [row['id'] for row in response.data['data']]
+            cursor = response.data['next']
+            if not cursor:
+                break
+        expected = list(Contact.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_filters(self):
+        response = self.client.get('/api/contact/', {'is_responded': 'false'})
+        self.assertEqual(len(response.data['data']), 3)
+        date_to = (timezone.now() - datetime.timedelta(days=2)).date().isoformat()
+        response = self.client.get('/api/contact/', {'date_to': date_to})
+        self.assertEqual({row['name'] for row in response.data['data']}, {'Client 0', 'Client 1'})
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/contact/', {'cursor': 'bogus'}).status_code, 404)
+        nulls = base64.urlsafe_b64encode(b'[null, null]').decode()
+        self.assertEqual(self.client.get('/api/contact/', {'cursor': nulls}).status_code, 404)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        staff = User.objects.create_user(email='staff@example.com', password='pw', is_staff=True)
+        self.client.force_authenticate(staff)
+        for i in range(3):
+            Contact.objects.create(name=f'Client {i}', email=f'c{i}@example.com', message='Line one\nline two')
+
+    def test_csv_export_streams(self):
+        response = self.client.get('/api/export/contacts.csv')
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('id,name,email,phone,message,created_at,is_responded'))
+        self.assertEqual(body.count('"Line one\nline two"'), 3)
+
+    def test_gzipped_ndjson_export(self):
+        response = self.client.get('/api/export/contacts.ndjson', {'gzip': '1'})
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Client 0', 'Client 1', 'Client 2'])
+
+    def test_export_is_staff_only(self):
+        self.assertEqual(APIClient().get('/api/export/bookings.csv').status_code, 403)
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', password='pw')
+        self.service = Services.objects.create(name='Consultation', price=100)
+        self.day = timezone.localdate() + datetime.timedelta(days=1)
+
+    def get_slots(self):
+        response = self.client.get(
+            f'/api/services/{self.service.id}/availability/',
+            {'from': self.day.isoformat(), 'to': (self.day + datetime.timedelta(days=1)).isoformat()},
+        )
+        self.assertEqual(response.status_code, 200)
+        return [day['slots'] for day in response.data['days']]
+
+    def test_booked_slots_are_removed_incrementally(self):
+        first, second = self.get_slots()
+        self.assertIn('10:00', first)
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/bookings/', {
+                'service_id': self.service.id, 'name': 'Client', 'date': self.day.isoformat(), 'time': '10:00',
+            }, format='json')
+        with self.assertNumQueries(0):  # service and bitmaps both come from the cache
+            first, second = self.get_slots()
+        self.assertNotIn('10:00', first)
+        self.assertIn('10:00', second)
+
+    def test_year_range_is_one_aggregated_query(self):
+        with self.assertNumQueries(2):  # catalog load + one aggregate
+            response = self.client.get(f'/api/services/{self.service.id}/availability/', {
+                'from': self.day.isoformat(), 'to': (self.day + datetime.timedelta(days=364)).isoformat(),
+            })
+        self.assertEqual(len(response.data['days']), 365)
+
+    def test_invalid_dates_are_rejected(self):
+        for value in ('2025-02-30', 'garbage', '9999-12-31'):
+            with self.subTest(value=value):
+                response = self.client.get(f'/api/services/{self.service.id}/availability/', {'from': value})
+                self.assertEqual(response.status_code, 400)
+
+    def test_bookings_on_other_days_keep_each_day_fresh(self):
+        self.get_slots()
+        for day in (self.day, self.day + datetime.timedelta(days=1)):
+            Booking.objects.bulk_create([Booking(user=self.user, service=self.service, name='Client', date=day,
+                                                 time='10:00')])
+        full_slot_bitmaps = availability.full_slot_bitmaps
+
+        def interleaved(service_id, date_from, date_to):
+            # The second day's refresh runs while the first is still in flight
+            if date_from == self.day:
+                availability.refresh_day(service_id, self.day + datetime.timedelta(days=1))
+            return full_slot_bitmaps(service_id, date_from, date_to)
+
+        with mock.patch.object(availability, 'full_slot_bitmaps', interleaved):
+            availability.refresh_day(self.service.id, self.day)
+        first, second = self.get_slots()
+        self.assertNotIn('10:00', first)
+        self.assertNotIn('10:00', second)
+
+
+class BookingListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', password='pw')
+        self.client.force_authenticate(self.user)
+        services = [Services.objects.create(name=f'Service {i}', price=100) for i in range(3)]
+        today = timezone.localdate()
+        Booking.objects.bulk_create([
+            Booking(user=self.user, service=services[i % 3], name='Client',
+                    date=today + datetime.timedelta(days=i - 5), time='10:00')
+            for i in range(12)
+        ])
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/bookings/')
+        self.assertEqual(len(response.data), 12)
+        self.assertEqual(response.data[0]['service']['name'], 'Service 0')
+
+    def test_invalid_date_filters_are_rejected(self):
+        for param in ('date_from', 'date_to'):
+            for value in ('2025-02-30', 'garbage'):
+                with self.subTest(param=param, value=value):
+                    self.assertEqual(self.client.get('/api/bookings/', {param: value}).status_code, 400)
+
+    def test_filters_and_cursor(self):
+        response = self.client.get('/api/bookings/', {'upcoming': '1', 'page_size': 4})
+        self.assertEqual(len(response.data), 4)
+        self.assertIn('rel="next"', response['Link'])
+        next_url = response['Link'][1:response['Link'].index('>')]
+        rest = self.client.get(next_url)
+        self.assertEqual(len(rest.data), 3)
+        self.assertNotIn('Link', rest)
+
+        today = timezone.localdate()
+        response = self.client.get('/api/bookings/', {
+            'date_from': (today - datetime.timedelta(days=1)).isoformat(), 'date_to': today.isoformat(),
+        })
+        self.assertEqual(len(response.data), 2)
+
+
+class ServicesCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.service = Services.objects.create(name='Consultation', price=100)
+
+    def test_catalog_is_served_from_cache(self):
+        self.client.get('/api/services/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/services/')
+            self.client.get(f'/api/service/{self.service.id}/')
+        self.assertEqual(response.data[0]['name'], 'Consultation')
+
+    def test_conditional_get_returns_304(self):
+        response = self.client.get('/api/services/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/services/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        since = response['Last-Modified']
+        self.assertEqual(self.client.get('/api/services/', HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+
+        item = self.client.get(f'/api/service/{self.service.id}/')
+        self.assertEqual(
+            self.client.get(f'/api/service/{self.service.id}/', HTTP_IF_NONE_MATCH=item['ETag']).status_code, 304
+        )
+
+    def test_save_invalidates_catalog(self):
+        etag = self.client.get('/api/services/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.price = 150
+            self.service.save()
+        response = self.client.get('/api/services/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['price'], '150.000')
+
+
+class BulkBookingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='client@example.com', password='pw')
+        self.client.force_authenticate(self.user)
+        self.service = Services.objects.create(name='Consultation', price=100)
+        self.day = timezone.localdate() + datetime.timedelta(days=1)
+        Booking.objects.create(user=self.user, service=self.service, name='Client', date=self.day, time='09:00')
+
+    def items(self, *times):
+        return [{'service_id': self.service.id, 'name': 'Client', 'date': self.day.isoformat(), 'time': t}
+                for t in times]
+
+    def test_partial_success_reports_item_errors(self):
+        items = self.items('09:00', '10:00', '11:00', '11:00') + [{'service_id': 999, 'name': 'x',
+                                                                    'date': self.day.isoformat(), 'time': '12:00'}]
+        # services, conflicts, savepoint, insert, two outbox rows, release
+        with self.assertNumQueries(7):
+            response = self.client.post('/api/bookings/bulk/', {'bookings': items}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([b['time'] for b in response.data['created']], ['10:00', '11:00'])
+        self.assertEqual([e['index'] for e in response.data['errors']], [0, 3, 4])
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+    def test_atomic_batch_is_all_or_nothing(self):
+        response = self.client.post('/api/bookings/bulk/', {'bookings': self.items('09:00', '10:00'), 'atomic': True},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        self.service = Services.objects.create(name='Consultation', price=100)
+        self.day = timezone.localdate() + datetime.timedelta(days=1)
+        self.users = [User.objects.create(email=f'client{i}@example.com') for i in range(3)]
+
+    def book(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/api/bookings/', {
+            'service_id': self.service.id, 'name': 'Client', 'date': self.day.isoformat(), 'time': '10:00',
+        }, format='json')
+
+    def test_double_booking_is_a_409(self):
+        self.assertEqual(self.book(self.users[0]).status_code, 201)
+        response = self.book(self.users[0])
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('already booked', response.data['non_field_errors'][0])
+
+    @override_settings(BOOKING_SLOT_CAPACITY=2)
+    def test_capacity_is_shared_across_users(self):
+        self.assertEqual(self.book(self.users[0]).status_code, 201)
+        self.assertEqual(self.book(self.users[1]).status_code, 201)
+        response = self.book(self.users[2])
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('fully booked', response.data['non_field_errors'][0])
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    databases = '__all__'  # request reads go to the replica mirror when one is configured
+    reservations = 200
+
+    @override_settings(BOOKING_SLOT_CAPACITY=3)
+    def test_parallel_reservations_never_overbook(self):
+        service = Services.objects.create(name='Consultation', price=100)
+        day = timezone.localdate() + datetime.timedelta(days=1)
+        users = User.objects.bulk_create(
+            [User(email=f'client{i}@example.com') for i in range(self.reservations)]
+        )
+
+        def book(user):
+            try:
+                client = APIClient()
+                client.force_authenticate(user)
+                return client.post('/api/bookings/', {
+                    'service_id': service.id, 'name': 'Client', 'date': day.isoformat(), 'time': '10:00',
+                }, format='json').status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            statuses = list(pool.map(book, users))
+
+        self.assertEqual(statuses.count(201), 3)
+        self.assertEqual(statuses.count(409), self.reservations - 3)
+        self.assertEqual(Booking.objects.filter(service=service, date=day, time='10:00').count(), 3)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_async_contact_queues_emails(self):
+        response = await self.async_client.post('/api/async/contact/', {
+            'name': 'Jane Client', 'email': 'Jane@Example.com', 'message': 'I need help with a contract.',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['data']['email'], 'jane@example.com')
+        self.assertEqual(await OutboxEmail.objects.acount(), 2)
+
+    async def test_async_register_then_login(self):
+        response = await self.async_client.post('/api/async/register/', {
+            'email': 'client@example.com', 'password': 's3cret-pass',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('password', response.json())
+
+        response = await self.async_client.post('/api/async/login/', {
+            'email': 'client@example.com', 'password': 'wrong',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.post('/api/async/login/', {
+            'email': 'client@example.com', 'password': 's3cret-pass',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('jwt', response.cookies)
+        self.assertIn('refresh', response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    router = routers.PrimaryReplicaRouter()
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Contact), 'default')
+
+    def test_request_reads_replica_until_it_writes(self):
+        token = routers.begin_request()
+        try:
+            self.assertEqual(self.router.db_for_read(Contact), 'replica')
+            self.assertEqual(self.router.db_for_write(Contact), 'default')
+            self.assertEqual(self.router.db_for_read(Contact), 'default')
+        finally:
+            self.assertTrue(routers.end_request(token))
+
+    def test_pinned_request_reads_primary(self):
+        token = routers.begin_request(pinned=True)
+        try:
+            self.assertEqual(self.router.db_for_read(Booking), 'default')
+        finally:
+            self.assertFalse(routers.end_request(token))
+
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_locked_replica_is_retried_on_the_next_sync(self):
+        locked = sqlite3.OperationalError('database is locked')
+        with mock.patch.object(sync_replica.Command, 'copy', side_effect=[locked, None]) as copy, \
+                mock.patch.object(sync_replica.time, 'sleep', side_effect=[None, KeyboardInterrupt]), \
+                self.assertLogs('accounts.management.commands.sync_replica', 'WARNING'):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('sync_replica', stdout=io.StringIO())
+        self.assertEqual(copy.call_count, 2)
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaPinningTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_write_pins_the_client_to_the_primary(self):
+        client = APIClient()
+        self.assertNotIn(PIN_COOKIE, client.get('/api/services/').cookies)
+        response = client.post('/api/contact/', {
+            'name': 'Jane Client', 'email': 'jane@example.com', 'message': 'Hello',
+        }, format='json')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+        self.client = APIClient()
+        self.staff_client = APIClient()
+        self.staff_client.force_authenticate(User.objects.create_user(email='staff@example.com', password='pw',
+                                                                      is_staff=True))
+        Contact.objects.create(name='Client', email='c@example.com', message='Please call me')
+
+    def test_server_timing_and_route_metrics(self):
+        response = self.client.get('/api/contact/')
+        self.assertRegex(response['Server-Timing'], r'^sql;dur=[\d.]+;desc="1 queries", total;dur=[\d.]+$')
+
+        body = self.staff_client.get('/api/metrics').content.decode()
+        self.assertIn('http_requests_total{route="api/contact/",method="GET",status="200"} 1', body)
+        self.assertIn('db_queries_total{route="api/contact/"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{route="api/contact/",method="GET"} 1', body)
+
+    def test_password_hashing_is_timed(self):
+        User.objects.create_user(email='client@example.com', password='s3cret-pass')
+        response = self.client.post('/api/login/', {'email': 'client@example.com', 'password': 's3cret-pass'},
+                                    format='json')
+        self.assertIn('hash;dur=', response['Server-Timing'])
+        body = self.staff_client.get('/api/metrics').content.decode()
+        self.assertIn('phase_duration_seconds_count{phase="hash"}', body)
+
+    def test_metrics_are_staff_only_without_token(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 403)
+        self.assertEqual(self.staff_client.get('/api/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 403)
+        response = self.client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+@override_settings(PROFILE_REQUESTS=True, PROFILE_MAX_FILES=2, PROFILE_STACK_INTERVAL_MS=1)
+class ProfilingTests(TemporaryDirectorySettingMixin, TestCase):
+    directory_setting = 'PROFILE_DIR'
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampled_requests_fill_a_bounded_ring(self):
+        client = APIClient()
+        for _ in range(3):
+            client.get('/api/services/')
+        profiles = profiling.list_profiles()
+        self.assertEqual(len(profiles), 2)
+        self.assertEqual({(p.route, p.kind) for p in profiles}, {('api_services', 'cprofile')})
+        self.assertGreater(pstats.Stats(profiles[0].path).total_calls, 0)
+
+    @override_settings(PROFILE_SAMPLE_RATE=0, PROFILE_SLOW_REQUEST_MS=20)
+    def test_slow_requests_keep_a_stack_profile(self):
+        client = APIClient()
+        client.get('/api/services/')
+        self.assertEqual(profiling.list_profiles(), [])
+
+        get_catalog = catalog.get_catalog
+
+        def slow_catalog():
+            time.sleep(0.05)
+            return get_catalog()
+
+        with mock.patch.object(catalog, 'get_catalog', slow_catalog):
+            client.get('/api/services/')
+        [profile] = profiling.list_profiles()
+        self.assertEqual(profile.kind, 'stack')
+        self.assertGreaterEqual(profile.ms, 50)
+        functions = {name for _, _, name in pstats.Stats(profile.path).stats}
+        self.assertIn('slow_catalog', functions)
+
+        output = io.StringIO()
+        call_command('profiles', '--summary', stdout=output)
+        self.assertIn('api_services', output.getvalue())
+
+
+class RequestLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'app.jsonl')
+        self.handler = BackgroundFileHandler(self.path)
+        self.addCleanup(self.handler.close)
+        logger = logging.getLogger('accounts')
+        logger.addHandler(self.handler)
+        self.addCleanup(logger.removeHandler, self.handler)
+
+    def read_lines(self):
+        self.handler.flush()
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_lines_carry_request_id_and_timings(self):
+        response = APIClient().post('/api/contact/', {
+            'name': 'Jane Client', 'email': 'jane@example.com', 'message': 'Hello',
+        }, format='json', HTTP_X_REQUEST_ID='abc123')
+        self.assertEqual(response['X-Request-ID'], 'abc123')
+
+        saved, access = self.read_lines()
+        self.assertEqual(saved['message'], 'Contact submission saved')
+        self.assertEqual(saved['request_id'], 'abc123')
+        self.assertEqual(access['logger'], 'accounts.requests')
+        self.assertEqual(access['request_id'], 'abc123')
+        self.assertEqual((access['route'], access['status']), ('api/contact/', 201))
+        self.assertEqual(access['sql_queries'], 5)  # savepoint, contact, two outbox rows, release
+        self.assertIn('duration_ms', access)
+
+    def test_exceptions_are_serialized(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logging.getLogger('accounts.views').exception('Failed %s', 'here')
+        [line] = self.read_lines()
+        self.assertEqual(line['message'], 'Failed here')
+        self.assertIn('ValueError: boom', line['exception'])
+        self.assertNotIn('request_id', line)
+
+    def test_dead_writer_does_not_hang_flush_or_close(self):
+        handler = BackgroundFileHandler(os.path.join(os.path.dirname(self.path), 'dead.jsonl'), timeout=0.2)
+        handler.queue.put(None)  # the writer thread is gone
+        handler.writer.join()
+        handler.handle(logging.makeLogRecord({'msg': 'never written'}))
+        started = time.monotonic()
+        handler.flush()
+        handler.close()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(handler.dropped, 1)
+
+
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        User.objects.create_user(email='client@example.com', password='s3cret-pass')
+
+    def login(self, ip='10.0.0.1', email='client@example.com'):
+        return self.client.post('/api/login/', {'email': email, 'password': 'wrong'}, format='json',
+                                REMOTE_ADDR=ip)
+
+    @override_settings(RATE_LIMITS={'login': (2, 1)})
+    def test_login_is_rejected_before_hashing(self):
+        self.assertEqual(self.login().status_code, 401)
+        self.assertEqual(self.login().status_code, 401)
+        with mock.patch.object(User, 'check_password') as check_password, self.assertNumQueries(0):
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        check_password.assert_not_called()
+
+    @override_settings(RATE_LIMITS={'login': (2, 1)})
+    def test_buckets_are_per_ip_and_per_email(self):
+        self.login(ip='10.0.0.1')
+        self.login(ip='10.0.0.2')
+        self.assertEqual(self.login(ip='10.0.0.3').status_code, 429)  # same email
+        self.assertEqual(self.login(ip='10.0.0.3', email='other@example.com').status_code, 404)
+
+    @override_settings(RATE_LIMITS={'login': (1, 1)}, TRUSTED_PROXY_COUNT=1)
+    def test_client_ip_comes_from_the_trusted_proxy(self):
+        def login(forwarded_for):
+            return self.client.post('/api/login/', {'email': f'{forwarded_for}@example.com', 'password': 'wrong'},
+                                    format='json', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for)
+
+        self.assertEqual(login('203.0.113.1').status_code, 404)
+        self.assertEqual(login('203.0.113.2').status_code, 404)  # another client behind the same proxy
+        # A spoofed left-hand entry doesn't buy the first client a new bucket
+        self.assertEqual(login('1.2.3.4, 203.0.113.1').status_code, 429)
+
+    def test_bucket_refills(self):
+        self.assertEqual(take_token('bucket', 1, 60, now=100), 0)
+        self.assertAlmostEqual(take_token('bucket', 1, 60, now=100.5), 0.5)
+        self.assertEqual(take_token('bucket', 1, 60, now=101.5), 0)
+
+    def test_identical_contact_is_saved_once(self):
+        data = {'name': 'Jane Client', 'email': 'jane@example.com', 'message': 'I need help with a contract.'}
+        first = self.client.post('/api/contact/', data, format='json')
+        again = self.client.post('/api/contact/', dict(data, message='  i need help with a CONTRACT. '),
+                                 format='json')
+        self.assertEqual(again.status_code, 201)
+        self.assertEqual(again.data['data']['id'], first.data['data']['id'])
+        self.assertEqual(Contact.objects.count(), 1)
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+
+class ContactSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='staff@example.com', password='pw',
+                                                                is_staff=True))
+        Contact.objects.create(name='Jane Contract', email='jane@example.com', message='A question about rent')
+        Contact.objects.create(name='Bob', email='bob@example.com',
+                               message='My landlord broke the contract and kept the deposit')
+        Contact.objects.create(name='Ann', email='ann@example.com', message='Divorce paperwork')
+
+    def search(self, q):
+        response = self.client.get('/api/contact/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_ranked_results_with_snippets(self):
+        results = self.search('contract')
+        self.assertEqual([r['name'] for r in results], ['Jane Contract', 'Bob'])  # name hits rank first
+        self.assertIn('<mark>contract</mark>', results[1]['snippet'])
+        self.assertEqual([r['name'] for r in self.search('landl')], ['Bob'])  # prefix on the last term
+        self.assertEqual(self.search('"contract OR divorce'), [])  # operators are plain words
+
+    def test_index_follows_updates_and_deletes(self):
+        Contact.objects.filter(name='Ann').update(message='Custody and contract questions')
+        self.assertEqual(len(self.search('contract')), 3)
+        Contact.objects.filter(name='Bob').delete()
+        self.assertEqual([r['name'] for r in self.search('deposit')], [])
+
+    def test_rebuild_in_batches(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        self.assertEqual(self.search('divorce'), [])
+        self.assertEqual(rebuild_index(batch_size=1), 3)
+        self.assertEqual([r['name'] for r in self.search('divorce')], ['Ann'])
+
+    def test_missing_triggers_are_reported_and_restored(self):
+        self.assertEqual(check_search_triggers(None, databases=['default']), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {FTS_TABLE}_ai")
+        warnings = check_search_triggers(None, databases=['default'])
+        self.assertEqual([warning.id for warning in warnings], ['accounts.W001'])
+        self.assertIn(f'{FTS_TABLE}_ai', warnings[0].msg)
+
+        call_command('rebuild_contact_search', stdout=io.StringIO())
+        self.assertEqual(missing_triggers(connection), [])
+        Contact.objects.create(name='Zed', email='zed@example.com', message='Probate question')
+        self.assertEqual([r['name'] for r in self.search('probate')], ['Zed'])
+
+    def test_search_is_staff_only(self):
+        self.assertEqual(APIClient().get('/api/contact/search/', {'q': 'contract'}).status_code, 403)
+
+    def test_snippet_escapes_message_html(self):
+        Contact.objects.create(name='Eve', email='eve@example.com',
+                               message='hello <script>alert(1)</script> <img src=x onerror=alert(1)> world')
+        snippet = self.search('hello')[0]['snippet']
+        self.assertEqual(snippet, '<mark>hello</mark> &lt;script&gt;alert(1)&lt;/script&gt; '
+                                  '&lt;img src=x onerror=alert(1)&gt; world')
+
+
+class ContactInboxTriageTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_user(email='staff@example.com', password='pw', is_staff=True)
+        self.client.force_authenticate(self.staff)
+        now = timezone.now()
+        for i in range(6):
+            Contact.objects.create(name=f'Client {i}', email=f'c{i}@example.com', message='Please call me',
+                                   is_responded=i < 2)
+        for i, contact in enumerate(Contact.objects.order_by('id')):
+            Contact.objects.filter(pk=contact.pk).update(created_at=now - datetime.timedelta(hours=10 - i))
+        self.waiting = list(Contact.objects.filter(is_responded=False).order_by('id').values_list('id', flat=True))
+
+    def test_inbox_uses_the_partial_index(self):
+        plan = Contact.objects.filter(is_responded=False).order_by('created_at', 'id')[:25].explain()
+        self.assertIn('contact_unresponded_idx', plan)
+
+    def test_inbox_lists_unresponded_oldest_first(self):
+        response = self.client.get('/api/contact/inbox/', {'page_size': 3})
+        self.assertEqual([row['id'] for row in response.data['data']], self.waiting[:3])
+        rest = self.client.get('/api/contact/inbox/', {'cursor': response.data['next']})
+        self.assertEqual([row['id'] for row in rest.data['data']], self.waiting[3:])
+
+    def test_bulk_actions_are_single_updates(self):
+        with self.assertNumQueries(2):  # assignee lookup + UPDATE
+            response = self.client.post('/api/contact/inbox/actions/', {
+                'action': 'assign', 'ids': self.waiting[:2], 'assignee': self.staff.id,
+            }, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        mine = self.client.get('/api/contact/inbox/', {'assigned_to': 'me'})
+        self.assertEqual([row['id'] for row in mine.data['data']], self.waiting[:2])
+
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/contact/inbox/actions/', {
+                'action': 'mark_responded', 'ids': self.waiting[:3],
+            }, format='json')
+        self.assertEqual(response.data['updated'], 3)
+        inbox = self.client.get('/api/contact/inbox/')
+        self.assertEqual([row['id'] for row in inbox.data['data']], self.waiting[3:])
+
+    def test_assign_requires_assignee(self):
+        response = self.client.post('/api/contact/inbox/actions/', {'action': 'assign', 'ids': self.waiting},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_assigned_to_is_rejected(self):
+        for value in ('abc', '²'):
+            with self.subTest(value=value):
+                self.assertEqual(self.client.get('/api/contact/inbox/', {'assigned_to': value}).status_code, 400)
+
+
+@override_settings(CONTACT_RETENTION_DAYS=30)
+class ArchiveTests(TemporaryDirectorySettingMixin, TestCase):
+    directory_setting = 'ARCHIVE_DIR'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='staff@example.com', password='pw',
+                                                                is_staff=True))
+        now = timezone.now()
+        for i in range(5):
+            contact = Contact.objects.create(name=f'Client {i}', email=f'c{i}@example.com', message='Old case')
+            # Two in January, two in February, one recent
+            created_at = now if i == 4 else datetime.datetime(2025, 1 + i // 2, 10 + i, tzinfo=datetime.timezone.utc)
+            Contact.objects.filter(pk=contact.pk).update(created_at=created_at)
+        self.ids = list(Contact.objects.order_by('id').values_list('id', flat=True))
+
+    def test_archives_in_monthly_files_and_deletes(self):
+        self.assertEqual(archive_contacts(retention_cutoff(), batch_size=3), 4)
+        self.assertEqual(list(Contact.objects.values_list('id', flat=True)), self.ids[4:])
+        self.assertEqual(
+            list(ArchivedContactBatch.objects.values_list('partition', 'count')),
+            [('2025-01', 2), ('2025-02', 1), ('2025-02', 1)],
+        )
+        output = io.StringIO()
+        call_command('archive_contacts', '--verify', stdout=output)
+        self.assertIn('match', output.getvalue())
+
+    def test_rerun_after_partial_run_resumes(self):
+        archive_contacts(retention_cutoff(), batch_size=1, max_batches=1)
+        self.assertEqual(Contact.objects.count(), 4)
+        self.assertEqual(archive_contacts(retention_cutoff(), batch_size=1), 3)
+        self.assertEqual(ArchivedContactBatch.objects.count(), 4)
+
+    def test_lookup_reads_one_batch(self):
+        archive_contacts(retention_cutoff())
+        response = self.client.get(f'/api/contact/archive/{self.ids[2]}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['name'], response.data['partition']), ('Client 2', '2025-02'))
+        self.assertEqual(response.data['created_at'], '2025-02-12T00:00:00+00:00')
+        self.assertEqual(self.client.get(f'/api/contact/archive/{self.ids[4]}/').status_code, 404)
+
+    def test_tampered_file_fails_verification(self):
+        archive_contacts(retention_cutoff())
+        batch = ArchivedContactBatch.objects.first()
+        with open(os.path.join(settings.ARCHIVE_DIR, batch.path), 'ab') as f:
+            f.write(b'garbage')
+        with self.assertRaises(CommandError):
+            call_command('archive_contacts', '--verify', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(self.client.get(f'/api/contact/archive/{self.ids[0]}/').status_code, 503)
+
+
+@override_settings(BOOKING_SLOT_CAPACITY=3)
+class GenerateDataTests(TestCase):
+    options = dict(users=30, services=4, bookings=200, contacts=50, seed=7, anchor='2026-03-02', hashes=2,
+                   stdout=io.StringIO())
+
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('email').values_list('email', 'first_name', 'password')),
+            list(Booking.objects.order_by('service__name', 'date', 'time', 'seat')
+                 .values_list('user__email', 'service__name', 'date', 'time', 'seat', 'created_at')),
+            list(Contact.objects.order_by('email').values_list('email', 'message', 'created_at', 'is_responded')),
+        )
+
+    def test_generates_requested_rows_within_constraints(self):
+        call_command('generate_data', hash_workers=2, **self.options)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Booking.objects.count(), 200)
+        self.assertEqual(Contact.objects.count(), 50)
+        self.assertEqual(Booking.objects.values('seat').distinct().count(), 3)
+        # created_at is spread out rather than all set to now
+        self.assertLess(Contact.objects.earliest('created_at').created_at.date(), datetime.date(2026, 1, 1))
+        self.assertTrue(self.client.login(email='user0000000@loadtest.invalid', password='load-test-password'))
+
+    def test_same_seed_gives_same_data(self):
+        call_command('generate_data', hash_workers=1, **self.options)
+        first = self.snapshot()
+        with self.assertRaises(CommandError):
+            call_command('generate_data', hash_workers=1, **self.options)
+        call_command('generate_data', hash_workers=1, replace=True, **self.options)
+        self.assertEqual(self.snapshot(), first)
+
+
+class HttpBenchmarkTests(SimpleTestCase):
+    def row(self, **values):
+        return dict(dict(endpoint='services', concurrency=1, p95_ms=10.0, sql_queries_max=1, errors=0), **values)
+
+    def test_regressions_against_baseline(self):
+        baseline = {'results': [self.row(), self.row(endpoint='user')]}
+        self.assertEqual(find_regressions([self.row(p95_ms=11.5), self.row(endpoint='contact')], baseline, 0.2), [])
+        self.assertEqual(
+            find_regressions([self.row(p95_ms=12.5, sql_queries_max=3)], baseline, 0.2),
+            ['services (concurrency 1): p95_ms 10.0 -> 12.5', 'services (concurrency 1): SQL queries 1 -> 3'],
+        )
+
+    def test_reads_query_count_from_server_timing(self):
+        self.assertEqual(sql_queries('hash;dur=210.0, sql;dur=1.2;desc="4 queries", total;dur=215.3'), 4)
+        self.assertEqual(sql_queries('total;dur=1.0'), 0)
+
+
+@override_settings(RATE_LIMITS={}, CONTACT_DEDUP_SECONDS=0)
+class HttpBenchmarkRunTests(LiveServerTestCase):
+    def test_runs_against_a_server(self):
+        User.objects.create_user(email='bench@example.com', password='bench-password')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = os.path.join(directory.name, 'results.json')
+        call_command('bench_http', url=self.live_server_url, email='bench@example.com', password='bench-password',
+                     endpoint=['bookings', 'contact'], requests=4, warmup=0, concurrency='1,2', output=output,
+                     stdout=io.StringIO())
+        with open(output) as f:
+            results = json.load(f)['results']
+        self.assertEqual([(row['endpoint'], row['concurrency']) for row in results],
+                         [('bookings', 1), ('bookings', 2), ('contact', 1), ('contact', 2)])
+        self.assertTrue(all(row['errors'] == 0 and row['sql_queries_max'] > 0 for row in results))
+        self.assertEqual(Contact.objects.count(), 8)
+
+        for row in results:
+            row['p95_ms'] /= 100
+        with open(output, 'w') as f:
+            json.dump({'results': results}, f)
+        with self.assertRaises(CommandError):
+            call_command('bench_http', url=self.live_server_url, email='bench@example.com',
+                         password='bench-password', endpoint=['bookings'], requests=4, warmup=0,
+                         concurrency='1', baseline=output, stdout=io.StringIO())
+
+
+@override_settings(RATE_LIMITS={}, CONTACT_DEDUP_SECONDS=0)
+class QueryBudgetTests(TemporaryDirectorySettingMixin, TestCase):
+    """
+    Every endpoint in accounts/urls.py runs a fixed number of queries, however
+    many rows there are. Caches are cleared before each request, so these are
+    the cold-path counts. A failure prints the SQL that ran.
+    """
+    SIZES = (1, 500)
+    directory_setting = 'ARCHIVE_DIR'
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='client@example.com', password='s3cret-pass')
+        self.staff = User.objects.create_user(email='staff@example.com', password='s3cret-pass', is_staff=True)
+        self.service = Services.objects.create(name='Consultation', price=100)
+        self.first_day = timezone.localdate() + datetime.timedelta(days=1)
+        self.archived_id = None
+
+    def grow(self, size):
+        """Bring services, the client's bookings, contacts and archived contacts up to `size` each"""
+        Services.objects.bulk_create(
+            Services(name=f'Service {i}', price=50) for i in range(Services.objects.count(), size)
+        )
+        Booking.objects.bulk_create(
+            Booking(user=self.user, service=self.service, name='Client', time=availability.SLOTS[i % 11],
+                    date=self.first_day + datetime.timedelta(days=i // 11))
+            for i in range(Booking.objects.filter(user=self.user).count(), size)
+        )
+        Contact.objects.bulk_create(
+            Contact(name=f'Client {i}', email=f'c{i}@example.com', message='A question about my contract',
+                    is_responded=i % 2 == 0)
+            for i in range(Contact.objects.count(), size)
+        )
+        old = Contact.objects.bulk_create(
+            Contact(name=f'Old client {i}', email=f'old{i}@example.com', message='An old case')
+            for i in range(ArchivedContactBatch.objects.aggregate(total=Sum('count'))['total'] or 0, size)
+        )
+        Contact.objects.filter(id__in=[contact.id for contact in old]).update(created_at=datetime.datetime(
+            2020, 1, 1, tzinfo=datetime.timezone.utc))
+        archive_contacts(retention_cutoff(), batch_size=100)
+        self.archived_id = self.archived_id or old[0].id
+
+    def api_client(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_access_token(user)}')
+        return client
+
+    def assertQueryBudget(self, budget, method, path, data=None, client=None):
+        client = client or self.api_client()
+        cache.clear()
+        principal_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(path, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, f"{method.upper()} {path}: {getattr(response, 'data', '')}")
+        if len(queries) != budget:
+            # Long statements (outbox inserts carry whole emails) are cut short
+            sql = '\n'.join(f"  {i}. {query['sql'][:300]}" for i, query in enumerate(queries, start=1))
+            self.fail(f"{method.upper()} {path} ran {len(queries)} queries, budget {budget}:\n{sql}")
+        return response
+
+    def test_public_endpoints(self):
+        for size in self.SIZES:
+            self.grow(size)
+            with self.subTest(size=size):
+                login = {'email': 'client@example.com', 'password': 's3cret-pass'}
+                register = {'email': f'new{size}@example.com', 'password': 'pw', 'first_name': 'New'}
+                contact = {'name': 'Jane', 'email': 'jane@example.com', 'message': f'Question number {size}'}
+                self.assertQueryBudget(0, 'get', '/api/csrf/')
+                self.assertQueryBudget(1, 'get', '/api/services/')
+                self.assertQueryBudget(1, 'get', f'/api/service/{self.service.id}/')
+                self.assertQueryBudget(2, 'get', f'/api/services/{self.service.id}/availability/')
+                self.assertQueryBudget(2, 'post', '/api/login/', login)
+                self.assertQueryBudget(2, 'post', '/api/async/login/', login)
+                self.assertQueryBudget(2, 'post', '/api/register/', register)
+                self.assertQueryBudget(2, 'post', '/api/async/register/',
+                                       dict(register, email=f'async{size}@example.com'))
+                self.assertQueryBudget(5, 'post', '/api/contact/', contact)
+                self.assertQueryBudget(5, 'post', '/api/async/contact/', dict(contact, message=f'Async {size}'))
+                self.assertQueryBudget(3, 'post', '/api/token/refresh/', {'refresh': issue_refresh_token(self.user)})
+
+    def test_client_endpoints(self):
+        client = self.api_client(self.user)
+        for size in self.SIZES:
+            self.grow(size)
+            day = str(self.first_day + datetime.timedelta(days=400 + size))
+            with self.subTest(size=size):
+                self.assertQueryBudget(1, 'get', '/api/user/', client=client)
+                self.assertQueryBudget(2, 'get', '/api/bookings/', client=client)
+                self.assertQueryBudget(2, 'get', '/api/bookings/?upcoming=1', client=client)
+                self.assertQueryBudget(9, 'post', '/api/bookings/',
+                                       {'service_id': self.service.id, 'name': 'Client', 'date': day, 'time': '09:00'},
+                                       client=client)
+                self.assertQueryBudget(8, 'post', '/api/bookings/bulk/', {'bookings': [
+                    {'service_id': self.service.id, 'name': 'Client', 'date': day, 'time': time}
+                    for time in ('10:00', '11:00', '12:00')
+                ]}, client=client)
+                client.cookies['refresh'] = issue_refresh_token(self.user)
+                self.assertQueryBudget(2, 'post', '/api/logout/', client=client)
+
+    def test_staff_endpoints(self):
+        client = self.api_client(self.staff)
+        for size in self.SIZES:
+            self.grow(size)
+            ids = list(Contact.objects.values_list('id', flat=True))
+            with self.subTest(size=size):
+                self.assertQueryBudget(1, 'get', '/api/metrics', client=client)
+                self.assertQueryBudget(2, 'get', '/api/contact/', client=client)
+                self.assertQueryBudget(2, 'get', '/api/contact/search/?q=contract', client=client)
+                self.assertQueryBudget(2, 'get', '/api/contact/inbox/', client=client)
+                self.assertQueryBudget(2, 'get', '/api/contact/inbox/?assigned_to=none', client=client)
+                self.assertQueryBudget(2, 'get', f'/api/contact/archive/{self.archived_id}/', client=client)
+                self.assertQueryBudget(3, 'post', '/api/contact/inbox/actions/',
+                                       {'action': 'assign', 'ids': ids, 'assignee': self.staff.id}, client=client)
+                self.assertQueryBudget(2, 'get', '/api/export/contacts.csv', client=client)
+                self.assertQueryBudget(2, 'get', '/api/export/bookings.ndjson', client=client)
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+# scope -> (burst, sustained requests per minute); see RATE_LIMITS in settings
+DEFAULT_RATE_LIMITS = {
+    'contact': (5, 2),
+    'login': (10, 5),
+    'register': (5, 1),
+}
+
+PENDING = 'pending'
+
+
+def rate_limit(scope):
+    return getattr(settings, 'RATE_LIMITS', DEFAULT_RATE_LIMITS).get(scope)
+
+
+def client_ip(request):
+    """
+    The client address. Behind TRUSTED_PROXY_COUNT reverse proxies it is the
+    entry that many places from the right of X-Forwarded-For (the address
+    the outermost trusted proxy saw); anything further left is set by the
+    client and can't be trusted. Falls back to REMOTE_ADDR.
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def take_token(key, burst, per_minute, now=None):
+    """
+    Token bucket stored in the cache as (tokens, updated_at). Returns 0 if
+    a token was taken, otherwise the seconds until the next one. The
+    read-modify-write isn't atomic, so concurrent requests can overdraw a
+    bucket slightly; that is fine for flood protection.
+    """
+    now = time.time() if now is None else now
+    rate = per_minute / 60
+    tokens, updated_at = cache.get(key) or (burst, now)
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens < 1:
+        cache.set(key, (tokens, now), int(burst / rate) + 1)
+        return (1 - tokens) / rate
+    cache.set(key, (tokens - 1, now), int(burst / rate) + 1)
+    return 0
+
+
+def check_rate(scope, request, email=None):
+    """
+    Take a token from the client IP's bucket and, when an email is given,
+    from that address's bucket too. Returns None if the request may go
+    ahead, otherwise the seconds to wait.
+    """
+    limit = rate_limit(scope)
+    if limit is None:
+        return None
+    keys = [f"ratelimit:{scope}:ip:{client_ip(request)}"]
+    if email:
+        digest = hashlib.sha256(str(email).strip().lower().encode()).hexdigest()[:32]
+        keys.append(f"ratelimit:{scope}:email:{digest}")
+    wait = max(take_token(key, *limit) for key in keys)
+    return wait or None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle for the public POST endpoints, configured by the view's
+    `throttle_scope`. Runs in APIView.initial(), so a rejected request
+    never reaches password hashing or the database.
+    """
+
+    def allow_request(self, request, view):
+        if request.method != 'POST':
+            return True
+        data = request.data if isinstance(request.data, dict) else {}
+        self.wait_seconds = check_rate(view.throttle_scope, request, data.get('email'))
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def submission_key(data):
+    """Content hash of a contact submission, ignoring case and whitespace differences"""
+    fields = [' '.join(str(data.get(name) or '').lower().split()) for name in ('name', 'email', 'phone', 'message')]
+    return 'contact:dedup:' + hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+
+def claim_submission(key):
+    """
+    Reserve a submission for CONTACT_DEDUP_SECONDS. Returns None if this is
+    the first copy, otherwise what remember_submission() stored for the
+    original (PENDING while it is still being saved).
+    """
+    window = getattr(settings, 'CONTACT_DEDUP_SECONDS', 600)
+    if not window or cache.add(key, PENDING, window):
+        return None
+    return cache.get(key, PENDING)
+
+
+def remember_submission(key, data):
+    cache.set(key, data, getattr(settings, 'CONTACT_DEDUP_SECONDS', 600))
+
+
+def release_submission(key):
+    """Forget a claimed submission that failed to save, so a retry goes through"""
+    cache.delete(key)
@@ -1,19 +1,34 @@
 from django.urls import path
 from .views import *
+from .async_views import AsyncContactView, AsyncLoginView, AsyncRegisterView
 
 urlpatterns = [
     path('login/', LoginView.as_view(), name="login"),
     path('register/', RegisterView.as_view(), name="register"),
     path('user/', UserView.as_view(), name="user"),
     path('logout/', LogoutView.as_view(), name="logout"),
+    path('token/refresh/', TokenRefreshView.as_view(), name="token_refresh"),
 
     path('services/', ServicesViewSet.as_view({'get': 'list'})),
     path('service/<int:pk>/', ServicesViewSet.as_view({'get': 'retrieve'})),
+    path('services/<int:pk>/availability/', ServiceAvailabilityView.as_view(), name='service_availability'),
 
     path('bookings/', BookingViewSet.as_view(), name="bookings"),
+    path('bookings/bulk/', BulkBookingView.as_view(), name="bookings_bulk"),
     
     path('contact/', ContactView.as_view(), name='contact_submission'),
+    path('contact/search/', ContactSearchView.as_view(), name='contact_search'),
+    path('contact/inbox/', ContactInboxView.as_view(), name='contact_inbox'),
+    path('contact/archive/<int:pk>/', ArchivedContactView.as_view(), name='contact_archive'),
+    path('contact/inbox/actions/', ContactInboxActionView.as_view(), name='contact_inbox_actions'),
+    path('export/<str:dataset>.<str:fmt>', ExportView.as_view(), name='export'),
 
     path('csrf/', CSRFView.as_view(), name='csrf'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+
+    # Async variants of the public endpoints for ASGI deployments
+    path('async/login/', AsyncLoginView.as_view(), name='async_login'),
+    path('async/register/', AsyncRegisterView.as_view(), name='async_register'),
+    path('async/contact/', AsyncContactView.as_view(), name='async_contact'),
 
 ]
@@ -1,4 +1,8 @@
 from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework import viewsets, permissions
@@ -13,13 +17,38 @@ from rest_framework import permissions, status
 from django.middleware.csrf import get_token
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
-from .auth import JWTAuthentication
+from .auth import (
+    JWTAuthentication,
+    delete_auth_cookies,
+    issue_access_token,
+    issue_refresh_token,
+    revoke_refresh_token,
+    rotate_refresh_token,
+    set_auth_cookies,
+)
 import jwt
 import datetime
-from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.utils.urls import replace_query_param
 import logging
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from . import availability, catalog, metrics
+from .archive import ChecksumMismatch, find_archived_contact
+from .emails import enqueue_email
+from .exports import CONTENT_TYPES, DATASETS, FORMATS, stream_export
+from .pagination import KeysetPagination
+from .reservations import AlreadyBooked, SlotFull, SlotUnavailable
+from .routers import PRIMARY
+from .search import search_contacts
+from .throttling import (
+    PENDING,
+    TokenBucketThrottle,
+    claim_submission,
+    release_submission,
+    remember_submission,
+    submission_key,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -27,6 +56,8 @@ logger = logging.getLogger(__name__)
 class RegisterView(APIView):
     authentication_classes = []  # No authentication for registration
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'register'
     
     def post(self, request):
         serializer = UserSerializer(data=request.data)
@@ -37,6 +68,8 @@ class RegisterView(APIView):
 class LoginView(APIView):
     authentication_classes = []  # No authentication for login
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]  # checked before the password is hashed
+    throttle_scope = 'login'
     
     @method_decorator(ensure_csrf_cookie)
     def post(self, request):
@@ -51,31 +84,70 @@ class LoginView(APIView):
         if user is None:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        if not user.check_password(password):
+        with metrics.timed('hash'):
+            password_ok = user.check_password(password)
+        if not password_ok:
             return Response({'error': 'Incorrect password'}, status=status.HTTP_401_UNAUTHORIZED)
         
-        payload = {
-            "id": user.id,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=60),
-            "iat": datetime.datetime.utcnow()
-        }
-
-        token = jwt.encode(payload, 'secret', algorithm='HS256')
-        
         response = Response()
-        response.set_cookie(
-            key='jwt', 
-            value=token, 
-            httponly=True, 
-            secure=settings.DEBUG,  # Use secure cookies in production
-            samesite='Lax'
-        )
+        set_auth_cookies(response, issue_access_token(user), issue_refresh_token(user))
         response.data = {
             'message': 'Login successful',
             'user': UserSerializer(user).data
         }
         return response
 
+class TokenRefreshView(APIView):
+    """
+    Exchange the refresh cookie for a new access token and a rotated
+    refresh token, without checking the password again.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+        token = request.COOKIES.get('refresh') or request.data.get('refresh')
+        if not token:
+            return Response({'error': 'Refresh token required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            user, access_token, refresh_token = rotate_refresh_token(token)
+        except AuthenticationFailed as e:
+            response = Response({'error': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+            delete_auth_cookies(response)
+            return response
+
+        response = Response({'message': 'Token refreshed'})
+        set_auth_cookies(response, access_token, refresh_token)
+        return response
+
+class MetricsView(APIView):
+    """
+    Prometheus text metrics for this process (GET /api/metrics).
+    When METRICS_TOKEN is set, scrapers must send it as a Bearer token;
+    without one the metrics are staff-only, never public. Outbox SMTP
+    timings live in the send_outbox process; see its --metrics-file.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.AllowAny]
+
+    def perform_authentication(self, request):
+        # Lazy: a scraper's metrics token is not a JWT, so the user is only
+        # looked up when no token is configured
+        pass
+
+    def get(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if token:
+            if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+                return Response({'error': 'Invalid metrics token'}, status=status.HTTP_403_FORBIDDEN)
+        elif not request.user.is_staff:
+            return Response({'error': 'Metrics are staff-only unless METRICS_TOKEN is set'},
+                            status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 class CSRFView(APIView):
     authentication_classes = []
     permission_classes = [permissions.AllowAny]
@@ -94,20 +166,49 @@ class UserView(APIView):
 
 class LogoutView(APIView):
     def post(self, request):
+        token = request.COOKIES.get('refresh')
+        if token:
+            revoke_refresh_token(token)
+
         response = Response()
-        response.delete_cookie('jwt')
+        delete_auth_cookies(response)
         response.data = {
             'message': 'Logout successful'
         }
         return response
     
 
+def filter_date_range(queryset, field, date_from=None, date_to=None):
+    """
+    Filter a DateTimeField by inclusive YYYY-MM-DD bounds. The bounds become
+    datetimes so the comparison can use an index on the column.
+    """
+    bounds = {}
+    for name, value in (('date_from', date_from), ('date_to', date_to)):
+        if not value:
+            continue
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{name} must be a date in YYYY-MM-DD format.")
+        if name == 'date_to':
+            day += datetime.timedelta(days=1)
+        bounds[name] = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+    if 'date_from' in bounds:
+        queryset = queryset.filter(**{f"{field}__gte": bounds['date_from']})
+    if 'date_to' in bounds:
+        queryset = queryset.filter(**{f"{field}__lt": bounds['date_to']})
+    return queryset
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class ContactView(APIView):
     """
     Handle contact form submissions
     """
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]  # POST only
+    throttle_scope = 'contact'
     
     def post(self, request):
         """Create a new contact submission"""
@@ -115,28 +216,12 @@ class ContactView(APIView):
             serializer = ContactSerializer(data=request.data)
             
             if serializer.is_valid():
-                # Save the contact submission
-                contact = serializer.save()
-                print(contact)
-                
-                # Send notification email to law firm
-                try:
-                    self.send_contact_notification(contact)
-                except Exception as e:
-                    logger.error(f"Failed to send notification email: {str(e)}")
-                    # Don't fail the API call if email fails
-                
-                # Send confirmation email to client
-                try:
-                    self.send_client_confirmation(contact)
-                except Exception as e:
-                    logger.error(f"Failed to send confirmation email: {str(e)}")
-                    # Don't fail the API call if email fails
+                data = self.save_submission(serializer)
                 
                 return Response({
                     'success': True,
                     'message': 'Thank you for your message. We will contact you within 24 hours.',
-                    'data': serializer.data
+                    'data': data
                 }, status=status.HTTP_201_CREATED)
             
             return Response({
@@ -153,59 +238,201 @@ class ContactView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def get(self, request):
-        """List all contact submissions (for admin use)"""
-        submissions = Contact.objects.all().order_by('-created_at')
-        serializer = ContactSerializer(submissions, many=True)
+        """
+        List contact submissions newest first (for admin use).
+        Supports ?is_responded=, ?date_from=, ?date_to=, ?page_size= and ?cursor=
+        """
+        submissions = Contact.objects.all()
+
+        is_responded = request.query_params.get('is_responded')
+        if is_responded is not None:
+            submissions = submissions.filter(is_responded=is_responded.lower() in ('1', 'true', 'yes'))
+
+        try:
+            submissions = filter_date_range(
+                submissions, 'created_at',
+                request.query_params.get('date_from'),
+                request.query_params.get('date_to'),
+            )
+        except ValueError as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = KeysetPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(submissions, request)
+        serializer = ContactSerializer(page, many=True)
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': serializer.data,
+            'next': paginator.next_cursor,
         })
     
+    def save_submission(self, serializer):
+        """
+        Save the contact submission and queue both emails together, and
+        return its serialized data. A copy of a submission made within
+        CONTACT_DEDUP_SECONDS gets the original's data instead, without
+        another insert or email.
+        """
+        key = submission_key(serializer.validated_data)
+        original = claim_submission(key)
+        if original is not None:
+            logger.info("Duplicate contact submission ignored")
+            return serializer.data if original == PENDING else original
+
+        try:
+            with transaction.atomic():
+                contact = serializer.save()
+                self.send_contact_notification(contact)
+                self.send_client_confirmation(contact)
+        except Exception:
+            release_submission(key)
+            raise
+        logger.info("Contact submission saved", extra={'contact_id': contact.id})
+        data = dict(serializer.data)
+        remember_submission(key, data)
+        return data
+    
     def send_contact_notification(self, contact):
-        """Send notification email to law firm"""
-        subject = f"KGMLP Website"
-        
-        # Create HTML email content
-        html_message = render_to_string('emails/contact_notification.html', {
-            'contact': contact,
-        })
-        
-        # Create plain text version
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.EMAIL_HOST_USER,
+        """Queue notification email to law firm"""
+        enqueue_email(
+            subject="KGMLP Website",
+            template_name='emails/contact_notification.html',
+            context={'contact': contact},
             recipient_list=[settings.CONTACT_EMAIL],
-            html_message=html_message,
-            fail_silently=False,
+            from_email=settings.EMAIL_HOST_USER,
         )
     
     def send_client_confirmation(self, contact):
-        """Send confirmation email to client"""
-        subject = "Thank you for contacting KGM Legal practitioners"
-        
-        # Create HTML email content
-        html_message = render_to_string('emails/client_confirmation.html', {
-            'contact': contact,
-        })
-        
-        # Create plain text version
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.EMAIL_HOST_USER,
+        """Queue confirmation email to client"""
+        enqueue_email(
+            subject="Thank you for contacting KGM Legal practitioners",
+            template_name='emails/client_confirmation.html',
+            context={'contact': contact},
             recipient_list=[contact.email],
-            html_message=html_message,
-            fail_silently=False,
+            from_email=settings.EMAIL_HOST_USER,
         )
 
 
 
 
+class ContactInboxView(APIView):
+    """
+    The queue of unresponded contact submissions, oldest first (staff only).
+    Served from the partial index on unresponded rows, so a page costs the
+    same however many answered messages the table holds.
+    Supports ?assigned_to=<user id>|me|none, ?page_size= and ?cursor=
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        submissions = Contact.objects.filter(is_responded=False)
+
+        assigned_to = request.query_params.get('assigned_to')
+        if assigned_to == 'none':
+            submissions = submissions.filter(assigned_to__isnull=True)
+        elif assigned_to == 'me':
+            submissions = submissions.filter(assigned_to=request.user)
+        elif assigned_to:
+            try:
+                user_id = int(assigned_to)
+            except ValueError:
+                return Response({'error': 'assigned_to must be a user id, "me" or "none"'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            submissions = submissions.filter(assigned_to_id=user_id)
+
+        paginator = KeysetPagination(ordering=('created_at', 'id'))
+        page = paginator.paginate_queryset(submissions, request)
+        return Response({
+            'data': InboxContactSerializer(page, many=True).data,
+            'next': paginator.next_cursor,
+        })
+
+
+class ContactInboxActionView(APIView):
+    """
+    Bulk triage (staff only). POST /api/contact/inbox/actions/ with
+    {"action": "mark_responded", "ids": [...]} or
+    {"action": "assign", "ids": [...], "assignee": <staff user id or null>}.
+    Each action is a single UPDATE, however many ids are given.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        serializer = InboxActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        contacts = Contact.objects.filter(id__in=data['ids'])
+        if data['action'] == InboxActionSerializer.MARK_RESPONDED:
+            updated = contacts.filter(is_responded=False).update(is_responded=True)
+        else:
+            updated = contacts.update(assigned_to=data['assignee'])
+        return Response({'action': data['action'], 'updated': updated})
+
+
+class ArchivedContactView(APIView):
+    """
+    One archived contact submission by id (staff only).
+    GET /api/contact/archive/<id>/ reads just the archive file covering that id.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, pk):
+        try:
+            row = find_archived_contact(pk)
+        except (ChecksumMismatch, FileNotFoundError) as e:
+            logger.error(f"Archive lookup for contact {pk} failed: {e}")
+            return Response({'error': 'The archive file for this contact is unavailable'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if row is None:
+            return Response({'error': 'Not found in the archive'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(row)
+
+
+class ContactSearchView(APIView):
+    """
+    Full-text search over contact submissions (staff only).
+    GET /api/contact/search/?q=contract+dispute&limit=20, best matches first.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    max_limit = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search_contacts(query, limit)
+        return Response({'results': ContactSearchResultSerializer(results, many=True).data})
+
+
+class ExportView(APIView):
+    """
+    Stream every contact submission or booking as CSV or NDJSON (staff only).
+    /api/export/contacts.csv, /api/export/bookings.ndjson, add ?gzip=1 to compress.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, dataset, fmt):
+        if dataset not in DATASETS or fmt not in FORMATS:
+            return Response({'error': 'Unknown export'}, status=status.HTTP_404_NOT_FOUND)
+
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        filename = f"{dataset}.{fmt}.gz" if compress else f"{dataset}.{fmt}"
+        response = StreamingHttpResponse(
+            stream_export(dataset, fmt, compress=compress),
+            content_type='application/gzip' if compress else CONTENT_TYPES[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+
+
 # Bookings Views
 
 class ServicesViewSet(viewsets.ReadOnlyModelViewSet):
@@ -217,6 +444,80 @@ class ServicesViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ServicesSerializer
     permission_classes = [permissions.AllowAny]  # Anyone can view services
 
+    def list(self, request):
+        data = catalog.get_catalog()
+        return self.conditional_response(request, data['items'], data['etag'], data['last_modified'])
+
+    def retrieve(self, request, pk=None):
+        item = catalog.get_service(pk)
+        if item is None:
+            return Response({'detail': 'No Services matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+        data, etag = item
+        return self.conditional_response(request, data, etag, catalog.get_catalog()['last_modified'])
+
+    def conditional_response(self, request, data, etag, last_modified):
+        """Serve the cached catalog, or a 304 when the client already has it"""
+        headers = {
+            'ETag': etag,
+            'Last-Modified': http_date(last_modified.timestamp()),
+            'Cache-Control': 'no-cache',  # always revalidate, which is cheap
+        }
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified.timestamp())
+        )
+        if not_modified is not None:
+            for header, value in headers.items():
+                not_modified[header] = value
+            return not_modified
+        return Response(data, headers=headers)
+
+
+class ServiceAvailabilityView(APIView):
+    """
+    Free booking slots per day for one service.
+    GET /api/services/<id>/availability/?from=YYYY-MM-DD&to=YYYY-MM-DD
+    """
+    permission_classes = [permissions.AllowAny]
+    max_days = 366
+
+    def get(self, request, pk):
+        try:
+            date_from = self.parse_param(request, 'from') or timezone.localdate()
+            date_to = self.parse_param(request, 'to') or date_from + datetime.timedelta(days=13)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if date_to < date_from:
+            return Response({'error': '`to` must not be before `from`'}, status=status.HTTP_400_BAD_REQUEST)
+        if (date_to - date_from).days >= self.max_days:
+            return Response({'error': f'Range is limited to {self.max_days} days'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if catalog.get_service(pk) is None:
+            return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        days = availability.free_slots(pk, date_from, date_to)
+        return Response({
+            'service': pk,
+            'from': date_from,
+            'to': date_to,
+            'days': [{'date': day, 'slots': slots} for day, slots in days],
+        })
+
+    def parse_param(self, request, name):
+        """A YYYY-MM-DD query parameter as a date, None when absent; ValueError when invalid"""
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None  # well formed but not a real date, e.g. 2025-02-30
+        if day is None:
+            raise ValueError(f"`{name}` must be a date in YYYY-MM-DD format")
+        # Leave room for the default range and the day-by-day walk past `to`
+        if day > datetime.date.max - datetime.timedelta(days=self.max_days):
+            raise ValueError(f"`{name}` is out of range")
+        return day
+
 
 class BookingViewSet(APIView):
     """
@@ -226,20 +527,48 @@ class BookingViewSet(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        # Get all bookings for the logged-in user
-        bookings = Booking.objects.filter(user=request.user)
-        serializer = BookingSerializer(bookings, many=True)
-        return Response(serializer.data)
+        """
+        List the logged-in user's bookings in (date, time) order.
+        Supports ?date_from=, ?date_to=, ?upcoming=1, ?page_size= and ?cursor=;
+        the cursor for the next page is sent in the Link header.
+        """
+        # select_related keeps the nested service serializer from querying per row
+        bookings = Booking.objects.filter(user=request.user).select_related('service')
+
+        for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    day = parse_date(value)
+                except ValueError:
+                    day = None  # well formed but not a real date, e.g. 2025-02-30
+                if day is None:
+                    return Response({param: ['Date must be in YYYY-MM-DD format.']},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                bookings = bookings.filter(**{lookup: day})
+        if request.query_params.get('upcoming') in ('1', 'true'):
+            bookings = bookings.filter(date__gte=timezone.localdate())
+
+        paginator = KeysetPagination(ordering=('date', 'time', 'id'), page_size=50)
+        page = paginator.paginate_queryset(bookings, request)
+        serializer = BookingSerializer(page, many=True)
+        response = Response(serializer.data)
+        if paginator.next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', paginator.next_cursor)
+            response['Link'] = f'<{next_url}>; rel="next"'
+        return response
 
     def post(self, request):
         serializer = BookingSerializer(data=request.data)
         
         if serializer.is_valid():
-            # Save booking with the current user
-            booking = serializer.save(user=request.user)
-            
-            # Send confirmation emails
-            self.send_confirmation_emails(booking, request)
+            # Save booking with the current user and queue confirmation emails
+            try:
+                with transaction.atomic():
+                    booking = serializer.save(user=request.user)
+                    self.send_confirmation_emails(booking, request)
+            except SlotUnavailable as e:
+                return Response({'non_field_errors': [str(e)]}, status=status.HTTP_409_CONFLICT)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -247,7 +576,7 @@ class BookingViewSet(APIView):
 
     def send_confirmation_emails(self, booking, request):
         """
-        Send confirmation emails to client and admin
+        Queue confirmation emails to client and admin
         """
         # Email to client
         self.send_client_confirmation(booking, request)
@@ -256,53 +585,152 @@ class BookingViewSet(APIView):
         self.send_admin_notification(booking, request)
 
     def send_client_confirmation(self, booking, request):
-        """Send confirmation email to the client"""
-        subject = f"Booking Confirmation - {booking.service.name}"
-        
-        # Create HTML email content
-        html_message = render_to_string('emails/booking_confirmation.html', {
-            'booking': booking,
-            'user': booking.user,
-            'service': booking.service,
-            'site_url': request.get_host(),
-        })
-        
-        plain_message = strip_tags(html_message)
-        
-        try:
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[booking.user.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-        except Exception as e:
-            print(f"Failed to send client confirmation email: {e}")
+        """Queue confirmation email to the client"""
+        enqueue_email(
+            subject=f"Booking Confirmation - {booking.service.name}",
+            template_name='emails/booking_confirmation.html',
+            context={
+                'booking': booking,
+                'user': booking.user,
+                'service': booking.service,
+                'site_url': request.get_host(),
+            },
+            recipient_list=[booking.user.email],
+        )
 
     def send_admin_notification(self, booking, request):
-        """Send notification email to admin/office"""
-        subject = f"New Booking Received - {booking.service.name}"
-        
-        # Create HTML email content
-        html_message = render_to_string('emails/admin_booking_notification.html', {
-            'booking': booking,
-            'user': booking.user,
-            'service': booking.service,
-            'site_url': request.get_host(),
-        })
-        
-        plain_message = strip_tags(html_message)
-        
+        """Queue notification email to admin/office"""
+        enqueue_email(
+            subject=f"New Booking Received - {booking.service.name}",
+            template_name='emails/admin_booking_notification.html',
+            context={
+                'booking': booking,
+                'user': booking.user,
+                'service': booking.service,
+                'site_url': request.get_host(),
+            },
+            recipient_list=[settings.CONTACT_EMAIL],  # Add your admin email in settings
+        )
+
+
+class BulkBookingView(APIView):
+    """
+    Create several bookings for the logged-in user in one request.
+    POST /api/bookings/bulk/ with {"bookings": [...], "atomic": false}.
+    Conflicts and slot capacity are checked with one query for the whole
+    batch, the valid bookings are inserted with bulk_create (the seat
+    constraint still guards against races), and one combined confirmation
+    goes to the client and to the office. With "atomic": true any error
+    rejects the whole batch.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_batch = 100
+
+    def post(self, request):
+        items = request.data.get('bookings') if isinstance(request.data, dict) else request.data
+        atomic = isinstance(request.data, dict) and str(request.data.get('atomic', '')).lower() in ('1', 'true')
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Expected a non-empty list of bookings'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch:
+            return Response({'error': f'At most {self.max_batch} bookings per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        errors = {}
+        valid = {}
+        for index, item in enumerate(items):
+            serializer = BulkBookingItemSerializer(data=item)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+
+        services = Services.objects.in_bulk({data['service_id'] for data in valid.values()})
+        for index, data in list(valid.items()):
+            if data['service_id'] not in services:
+                errors[index] = {'service_id': ['Invalid pk - object does not exist.']}
+                del valid[index]
+
+        for index, message in self.find_conflicts(request.user, valid).items():
+            errors[index] = {'non_field_errors': [message]}
+            del valid[index]
+
+        error_list = [{'index': index, 'errors': errors[index]} for index in sorted(errors)]
+        if not valid or (atomic and errors):
+            return Response({'created': [], 'errors': error_list}, status=status.HTTP_400_BAD_REQUEST)
+
+        bookings = [
+            Booking(user=request.user, service=services[data['service_id']],
+                    **{key: value for key, value in data.items() if key != 'service_id'})
+            for data in valid.values()
+        ]
         try:
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[settings.CONTACT_EMAIL],  # Add your admin email in settings
-                html_message=html_message,
-                fail_silently=False,
-            )
-        except Exception as e:
-            print(f"Failed to send admin notification email: {e}")
+            with transaction.atomic():
+                Booking.objects.bulk_create(bookings)
+                self.send_confirmation_emails(request.user, bookings)
+        except IntegrityError:
+            # Another request took one of these slots after the conflict check
+            return Response({'error': 'One or more slots were just booked. Please try again.'},
+                            status=status.HTTP_409_CONFLICT)
+
+        # bulk_create sends no signals, so refresh the availability cache here
+        for service_id, day in {(booking.service_id, booking.date) for booking in bookings}:
+            transaction.on_commit(lambda service_id=service_id, day=day: availability.refresh_day(service_id, day))
+
+        return Response({
+            'created': BookingSerializer(bookings, many=True).data,
+            'errors': error_list,
+        }, status=status.HTTP_201_CREATED)
+
+    def find_conflicts(self, user, valid):
+        """
+        Check every item against the existing bookings for the same slots in
+        one query and assign each accepted item a free seat. Returns
+        {index: error message} for the items that can't be booked.
+        """
+        keys = {index: (data['service_id'], data['date'], data['time']) for index, data in valid.items()}
+        if not keys:
+            return {}
+        # The primary, so seats taken since the last replica sync are seen
+        taken = Booking.objects.using(PRIMARY).filter(
+            service_id__in={key[0] for key in keys.values()},
+            date__in={key[1] for key in keys.values()},
+            time__in={key[2] for key in keys.values()},
+        ).values_list('user_id', 'service_id', 'date', 'time', 'seat')
+
+        own, seats = set(), {}
+        for user_id, service_id, date, time, seat in taken:
+            seats.setdefault((service_id, date, time), set()).add(seat)
+            if user_id == user.id:
+                own.add((service_id, date, time))
+
+        capacity = availability.slot_capacity()
+        conflicts = {}
+        for index, key in keys.items():
+            if key in own:
+                conflicts[index] = str(AlreadyBooked())
+                continue
+            used = seats.setdefault(key, set())
+            free = next((seat for seat in range(capacity) if seat not in used), None)
+            if free is None:
+                conflicts[index] = str(SlotFull())
+                continue
+            valid[index]['seat'] = free
+            used.add(free)
+            own.add(key)
+        return conflicts
+
+    def send_confirmation_emails(self, user, bookings):
+        """Queue one combined confirmation to the client and one to admin/office"""
+        context = {'user': user, 'bookings': bookings}
+        enqueue_email(
+            subject=f"Booking Confirmation - {len(bookings)} appointment(s)",
+            template_name='emails/bulk_booking_confirmation.html',
+            context=context,
+            recipient_list=[user.email],
+        )
+        enqueue_email(
+            subject=f"New Bookings Received - {len(bookings)} appointment(s)",
+            template_name='emails/admin_bulk_booking_notification.html',
+            context=context,
+            recipient_list=[settings.CONTACT_EMAIL],
+        )
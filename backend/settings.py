@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.middleware.RequestLogMiddleware',
+    'accounts.middleware.MetricsMiddleware',
+    'accounts.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +56,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
+    'accounts.middleware.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -59,7 +64,7 @@ ROOT_URLCONF = 'backend.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR, 'tmp'],
+        'DIRS': [BASE_DIR, BASE_DIR / 'tmp'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -82,9 +87,104 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests instead of reconnecting
+        # (and re-running the pragmas below) every time
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN, so a transaction that reads and
+            # then writes waits its turn instead of failing with
+            # "database is locked" when it tries to upgrade its lock
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 5,
+        },
+        'TEST': {
+            # A file rather than shared-cache memory, so threaded tests get
+            # real SQLite file locking instead of "table is locked" errors
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# Read replicas (accounts.routers). Setting DB_REPLICA_PATH adds a second
+# SQLite file that `python manage.py sync_replica` keeps copied from the
+# primary; request reads are then served from it.
+if os.environ.get('DB_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['DB_REPLICA_PATH'],
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['accounts.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 5  # a client reads from the primary this long after it writes
+
+
+# Cache
+# Per-process memory cache. Use a shared backend (Redis/Memcached) when
+# running several worker processes, so that JWT principal revocations and
+# the catalog/availability version bumps reach all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+CATALOG_CACHE_TTL = 300  # seconds a catalog version is kept (bounds cross-process staleness)
+
+
+# Threads the async login/register views hash passwords on
+PASSWORD_HASHER_WORKERS = 4
+
+
+# SQLite tuning profile, applied to each new connection (accounts.sqlite).
+# WAL lets readers run alongside the single writer; synchronous=NORMAL is
+# durable in WAL mode except for the last commits on power loss.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms to wait for a lock before "database is locked"
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # negative means KiB, so ~20MB per connection
+}
+
+
+# Token buckets for the public POST endpoints (accounts.throttling), applied
+# per client IP and per email address: scope -> (burst, requests per minute)
+RATE_LIMITS = {
+    'contact': (5, 2),
+    'login': (10, 5),
+    'register': (5, 1),
+}
+CONTACT_DEDUP_SECONDS = 600  # identical contact messages within this window are not saved again
+# Reverse proxies in front of the app that append to X-Forwarded-For; the
+# rate limits use the client address they report. 0 = use REMOTE_ADDR
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
+
+# Contact archival (`python manage.py archive_contacts`)
+CONTACT_RETENTION_DAYS = 365  # older submissions move to gzipped NDJSON files
+ARCHIVE_DIR = BASE_DIR / 'archive'
+
+
+# GET /api/metrics (accounts.metrics); set a token to require
+# "Authorization: Bearer <token>" from the scraper. Without one only
+# logged-in staff can read the metrics.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+# Request profiling (accounts.middleware.ProfilingMiddleware), off unless
+# PROFILE_REQUESTS=1. Inspect the captured files with `manage.py profiles`.
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS') == '1'
+PROFILE_SAMPLE_RATE = 0.01  # fraction of requests run under cProfile
+PROFILE_SLOW_REQUEST_MS = 1000  # stack-sampled requests this slow are kept; None to disable
+PROFILE_STACK_INTERVAL_MS = 5
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_MAX_FILES = 100  # oldest profiles are deleted beyond this
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -115,6 +215,14 @@ EMAIL_HOST_PASSWORD = 'oaga tvji wuup iyjw'
 DEFAULT_FROM_EMAIL = 'KGM Legal Practitioner <noreply@kgmlegalpractitioners.com>'
 CONTACT_EMAIL = 'iphiri143@gmail.com'  # Where contact form submissions go
 
+# Outbox delivery (see `python manage.py send_outbox`)
+OUTBOX_MAX_ATTEMPTS = 5  # after this many failures an email is dead-lettered
+OUTBOX_BACKOFF_SECONDS = 30  # doubled after every failed attempt
+OUTBOX_MAX_BACKOFF_SECONDS = 3600
+OUTBOX_LEASE_SECONDS = 300  # how long a worker holds a claimed batch
+EMAIL_POOL_SIZE = 2  # open SMTP connections kept by the worker
+EMAIL_POOL_MAX_IDLE_SECONDS = 60  # reconnect instead of reusing a session idle this long
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -127,6 +235,18 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Token lifetimes; the refresh cookie is exchanged at /api/token/refresh/
+JWT_ACCESS_TOKEN_LIFETIME_MINUTES = 15
+JWT_REFRESH_TOKEN_LIFETIME_DAYS = 14
+
+# Booking slots (see accounts.availability)
+BOOKING_SLOT_CAPACITY = 1  # bookings one service can take in the same hour
+AVAILABILITY_CACHE_TTL = 300  # seconds a cached day of slot bitmaps is kept
+
+# Verified token -> user cache used by accounts.auth.JWTAuthentication
+JWT_PRINCIPAL_CACHE_SIZE = 1024
+JWT_PRINCIPAL_CACHE_TTL = 300  # seconds; never outlives the token's exp, checked against a shared revocation marker
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'accounts.auth.JWTAuthentication',
@@ -139,22 +259,33 @@ REST_FRAMEWORK = {
 
 
 # Logging
+# Records are queued in memory and written as JSON lines by a background
+# thread (accounts.log.BackgroundFileHandler), rotating at 10MB.
+LOG_DIR = BASE_DIR / 'logs'
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'handlers': {
-        'file': {
+        'json': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': 'contact_submissions.log',
+            'class': 'accounts.log.BackgroundFileHandler',
+            'filename': LOG_DIR / 'app.jsonl',
+            'max_bytes': 10 * 1024 * 1024,
+            'backup_count': 5,
         },
     },
     'loggers': {
-        'your_app_name.views': {  # Replace with your app name
-            'handlers': ['file'],
+        'accounts': {
+            'handlers': ['json'],
             'level': 'INFO',
             'propagate': True,
         },
+        'django.request': {
+            'handlers': ['json'],
+            'level': 'WARNING',
+            'propagate': True,
+        },
     },
 }
 